@@ -1,18 +1,28 @@
-import glob
+import contextlib
+import fnmatch
+import functools
+import hashlib
+import io
 import os
+import site
 import sys
 import tempfile
 import threading
 import time
 import traceback
+from collections import OrderedDict
+
+import numpy as np
 
 from audio_utils import (
     build_word_timings,
+    decode_wav_to_float32,
     decode_wav_to_mono_pcm16,
     detect_offline_segments,
     encode_wav_pcm16_mono,
     offset_word_timings,
 )
+from runtime_env import add_nvidia_paths, default_cpu_threads, limit_openmp_threads
 from text_processing import (
     apply_text_corrections,
     drop_word_timing_prefix,
@@ -22,44 +32,19 @@ from text_processing import (
     parse_positive_int,
     parse_text_corrections,
 )
+from worker_pool import DaemonThreadPool
 
 DEFAULT_SENSEVOICE_MODEL_ID = "FunAudioLLM/SenseVoiceSmall"
 DEFAULT_SENSEVOICE_VAD_MODEL = "fsmn-vad"
 
 
-def add_nvidia_paths():
-    """Add NVIDIA library paths to DLL search path for Windows."""
-    if os.name != "nt":
-        return
-
-    import site
-
-    possible_paths = site.getsitepackages() if hasattr(site, "getsitepackages") else []
-    for path in sys.path:
-        if "site-packages" in path and os.path.isdir(path) and path not in possible_paths:
-            possible_paths.append(path)
-
-    for site_packages in possible_paths:
-        nvidia_path = os.path.join(site_packages, "nvidia")
-        if not os.path.isdir(nvidia_path):
-            continue
-
-        for item in os.listdir(nvidia_path):
-            bin_path = os.path.join(nvidia_path, item, "bin")
-            if os.path.isdir(bin_path):
-                try:
-                    os.add_dll_directory(bin_path)
-                except Exception:
-                    pass
-                os.environ["PATH"] = bin_path + os.pathsep + os.environ.get("PATH", "")
-        return
-
-
-add_nvidia_paths()
-
 # Global model instance
 _model = None
 _model_lock = threading.Lock()
+# (get_model argument tuple, model) for the active model, swapped as one object
+_active_model = None
+# Bumped whenever the active model changes, so cached /health bodies go stale
+_model_state_version = 0
 _model_info = {
     "engine": None,
     "model_type": None,
@@ -70,6 +55,26 @@ _model_info = {
     "compute_type": None,
     "download_root": None,
 }
+# Every loaded model keyed by its get_model arguments, least recently used
+# first; the active one is also published as _model/_model_info. Keeping a
+# few around lets clients alternate model/device/compute variants without
+# reloading weights each time.
+_loaded_models = OrderedDict()
+# Model calls run on a small dedicated pool sized for the active model (see
+# inference_worker_count) so HTTP/WS threads queue here instead of piling up
+# inside the model; at most max_pending_inference calls may wait or run. Daemon
+# workers, so a call still running at shutdown doesn't hold the process open.
+_inference_executor = DaemonThreadPool(1, thread_name_prefix="asr-inference")
+_inference_workers = 1
+# Guards swapping _inference_executor against a concurrent submit to the old one
+_inference_executor_lock = threading.Lock()
+_inference_pending = 0
+_inference_pending_lock = threading.Lock()
+# Recent HTTP results keyed by audio digest plus every decoding option; the
+# entries are small dicts of text, so a count bound is enough.
+RESULT_CACHE_MAX_ENTRIES = 128
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
 _runtime_policy = {
     "engine": "faster-whisper",
     "lock_model": False,
@@ -85,20 +90,86 @@ _runtime_policy = {
     "sensevoice_vad_max_single_segment_time_ms": 30000,
     "device": "cpu",
     "compute_type": "int8",
+    "sensevoice_compute_type": "float32",
     "download_root": None,
+    "max_loaded_models": 2,
+    "inference_workers": None,
+    "cpu_threads": None,
+    "max_pending_inference": 16,
+    "batch_size": 8,
     "ws_port": 8766,
 }
 
 
+class InferenceOverloadedError(RuntimeError):
+    """Raised when the inference queue is full; HTTP callers answer 503."""
+
+
+def inference_worker_count(engine: str, device: str) -> int:
+    """Concurrent model calls worth running for an engine/device."""
+    if _runtime_policy["inference_workers"]:
+        return max(1, _runtime_policy["inference_workers"])
+    if engine == "faster-whisper" and device == "cpu":
+        # One CTranslate2 replica per ~4 compute threads; more would oversubscribe OpenMP
+        return max(1, cpu_thread_budget() // 4)
+    # One GPU stream / one torch model: extra workers only add VRAM pressure
+    return 1
+
+
+def _resize_inference_executor(workers: int):
+    """Swap in a pool of the given size; calls already queued finish on the old one."""
+    global _inference_executor, _inference_workers
+    with _inference_executor_lock:
+        if workers == _inference_workers:
+            return
+        old_executor = _inference_executor
+        _inference_executor = DaemonThreadPool(workers, thread_name_prefix="asr-inference")
+        _inference_workers = workers
+        old_executor.shutdown(wait=False)
+    print(f"[Server] Inference workers: {workers}", flush=True)
+
+
+def run_inference(fn, *args, **kwargs):
+    """Run a model call on the shared inference pool and wait for its result."""
+    global _inference_pending
+    with _inference_pending_lock:
+        if _inference_pending >= max(1, _runtime_policy["max_pending_inference"]):
+            raise InferenceOverloadedError("Inference queue is full, retry later")
+        _inference_pending += 1
+    try:
+        # Submit under the swap lock so a resize can't shut the pool down in between;
+        # wait for the result outside it
+        with _inference_executor_lock:
+            future = _inference_executor.submit(fn, *args, **kwargs)
+        return future.result()
+    finally:
+        with _inference_pending_lock:
+            _inference_pending -= 1
+
+
 def ensure_download_env(download_root: str | None):
     if not download_root:
         return
     os.makedirs(download_root, exist_ok=True)
     os.environ["HF_HOME"] = download_root
     os.environ["MODELSCOPE_CACHE"] = download_root
+    # Keep JIT-compiled CUDA kernels next to the models so later runs skip recompiling
+    os.environ.setdefault("CUDA_CACHE_PATH", os.path.join(download_root, "cuda_cache"))
+    os.environ.setdefault("CUDA_MODULE_LOADING", "LAZY")
+
+
+def cpu_thread_budget() -> int:
+    """Total CTranslate2 compute threads for CPU inference."""
+    return default_cpu_threads(_runtime_policy["cpu_threads"])
 
 
 def load_faster_whisper_model(model_type: str, device: str, compute_type: str, download_root: str | None):
+    num_workers = inference_worker_count("faster-whisper", device)
+    cpu_threads = max(1, cpu_thread_budget() // num_workers) if device == "cpu" else 0
+    if cpu_threads:
+        limit_openmp_threads(cpu_threads)
+
+    add_nvidia_paths()
     from faster_whisper import WhisperModel
 
     return WhisperModel(
@@ -106,6 +177,9 @@ def load_faster_whisper_model(model_type: str, device: str, compute_type: str, d
         device=device,
         compute_type=compute_type,
         download_root=download_root,
+        # Lets the inference pool's workers transcribe in parallel
+        num_workers=num_workers,
+        cpu_threads=cpu_threads,
     )
 
 
@@ -116,11 +190,15 @@ def load_sensevoice_model(
     *,
     sensevoice_vad_model: str | None = None,
     sensevoice_vad_max_single_segment_time_ms: int | None = None,
+    compute_type: str | None = None,
 ):
+    add_nvidia_paths()
     from funasr import AutoModel
 
     ensure_download_env(download_root)
     resolved_device = resolve_sensevoice_device(device)
+    if resolved_device.startswith("cuda"):
+        enable_torch_tf32()
     options = {
         "model": sensevoice_model_id,
         "device": resolved_device,
@@ -136,15 +214,94 @@ def load_sensevoice_model(
             options["vad_kwargs"] = {
                 "max_single_segment_time": sensevoice_vad_max_single_segment_time_ms
             }
-    return AutoModel(
-        **options,
-    )
+    with mmap_torch_load():
+        model = AutoModel(
+            **options,
+        )
+    apply_sensevoice_compute_type(model, resolved_device, compute_type)
+    return model
+
+
+def apply_sensevoice_compute_type(model, resolved_device: str, compute_type: str | None):
+    """Map an explicitly requested compute type onto SenseVoice's torch model.
+
+    On CUDA, float16/int8_float16 run generate() under fp16 autocast; on CPU, int8
+    dynamically quantizes the Linear layers. Anything else (the float32 default) or
+    a failure keeps funasr's fp32 numerics.
+    """
+    model.autocast_dtype = None
+    if compute_type not in ("float16", "int8_float16", "int8"):
+        return
+    try:
+        import torch
+
+        if resolved_device.startswith("cuda"):
+            if compute_type in ("float16", "int8_float16"):
+                model.autocast_dtype = torch.float16
+        elif compute_type == "int8":
+            model.model = torch.ao.quantization.quantize_dynamic(
+                model.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+    except Exception as e:
+        print(f"[Server] SenseVoice {compute_type} setup failed, using float32: {e}", flush=True)
+
+
+def sensevoice_generate(model, **options):
+    autocast_dtype = getattr(model, "autocast_dtype", None)
+    if autocast_dtype is None:
+        return model.generate(**options)
+    import torch
+
+    with torch.autocast("cuda", dtype=autocast_dtype):
+        return model.generate(**options)
+
+
+@contextlib.contextmanager
+def mmap_torch_load():
+    """Make torch.load memory-map checkpoint files while a model is being built.
+
+    funasr reads the whole state dict into RAM before copying it into the model;
+    mapping the file lets the copy page weights in directly. Only used under
+    _model_lock, so the temporary patch is not raced by another loader.
+    """
+    import torch
+
+    original_load = torch.load
+
+    def load(f, *args, **kwargs):
+        if "mmap" not in kwargs and isinstance(f, (str, os.PathLike)):
+            try:
+                return original_load(f, *args, mmap=True, **kwargs)
+            except (TypeError, ValueError, RuntimeError):
+                # Older torch, or a legacy (non-zipfile) checkpoint
+                pass
+        return original_load(f, *args, **kwargs)
+
+    torch.load = load
+    try:
+        yield
+    finally:
+        torch.load = original_load
+
+
+@functools.lru_cache(maxsize=None)
+def enable_torch_tf32():
+    """Let fp32 matmuls/convs use TF32 tensor cores (Ampere and newer)."""
+    import torch
+
+    # cudnn.benchmark stays off: utterance lengths vary, so it would re-tune on most requests
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+    torch.set_float32_matmul_precision("high")
 
 
+@functools.lru_cache(maxsize=None)
 def resolve_sensevoice_device(device: str) -> str:
+    """Map the requested device to a torch device string (cached; called on every SenseVoice request)."""
     if device != "cuda":
         return "cpu"
     try:
+        add_nvidia_paths()
         import torch
 
         if torch.cuda.is_available():
@@ -168,6 +325,78 @@ def normalize_model_type(engine: str, model_type: str | None) -> str | None:
     return model_type or "tiny"
 
 
+def _collect_reload_reasons(
+    engine: str,
+    normalized_model_type: str | None,
+    sensevoice_model_id: str,
+    sensevoice_vad_model: str | None,
+    sensevoice_vad_max_single_segment_time_ms: int | None,
+    device: str,
+    compute_type: str,
+    download_root: str | None,
+) -> list[str]:
+    reload_reasons = []
+    if _model is None:
+        reload_reasons.append("model_uninitialized")
+    if _model_info["engine"] != engine:
+        reload_reasons.append("engine_changed")
+    if normalized_model_type != _model_info["model_type"]:
+        reload_reasons.append("model_type_changed")
+    if _model_info["sensevoice_model_id"] != sensevoice_model_id:
+        reload_reasons.append("sensevoice_model_id_changed")
+    if _model_info["sensevoice_vad_model"] != sensevoice_vad_model:
+        reload_reasons.append("sensevoice_vad_model_changed")
+    if (
+        _model_info["sensevoice_vad_max_single_segment_time_ms"]
+        != sensevoice_vad_max_single_segment_time_ms
+    ):
+        reload_reasons.append("sensevoice_vad_max_single_segment_time_ms_changed")
+    if _model_info["device"] != device:
+        reload_reasons.append("device_changed")
+    if _model_info["compute_type"] != compute_type:
+        reload_reasons.append("compute_type_changed")
+    if _model_info["download_root"] != download_root:
+        reload_reasons.append("download_root_changed")
+    return reload_reasons
+
+
+def _model_info_for(model_args: tuple) -> dict:
+    """Map get_model's argument tuple back to the _model_info fields."""
+    return dict(
+        zip(
+            (
+                "engine",
+                "model_type",
+                "sensevoice_model_id",
+                "sensevoice_vad_model",
+                "sensevoice_vad_max_single_segment_time_ms",
+                "device",
+                "compute_type",
+                "download_root",
+            ),
+            model_args,
+        )
+    )
+
+
+def list_loaded_models() -> list[dict]:
+    """Describe the resident models, least recently used first."""
+    with _model_lock:
+        return [
+            {**_model_info_for(model_args), "active": model is _model}
+            for model_args, model in _loaded_models.items()
+        ]
+
+
+def _log_model_reuse(engine: str, model_type: str | None, sensevoice_model_id: str, device: str, compute_type: str):
+    model_name = model_type if engine == "faster-whisper" else sensevoice_model_id
+    print(
+        f"[Server] Reusing loaded model: engine={engine}, model={model_name}, "
+        f"device={device}, compute={compute_type}",
+        flush=True,
+    )
+
+
 def get_model(
     engine: str,
     model_type: str | None,
@@ -178,40 +407,47 @@ def get_model(
     compute_type: str,
     download_root: str | None,
 ):
-    """Get or create the model singleton."""
-    global _model, _model_info
+    """Get the active model, switching to a cached one or loading it as needed."""
+    global _model, _model_info, _active_model, _model_state_version
 
+    compute_type = resolve_engine_compute_type(engine, device, compute_type)
     normalized_model_type = normalize_model_type(engine, model_type)
+    model_args = (
+        engine,
+        normalized_model_type,
+        sensevoice_model_id,
+        sensevoice_vad_model,
+        sensevoice_vad_max_single_segment_time_ms,
+        device,
+        compute_type,
+        download_root,
+    )
 
-    with _model_lock:
-        reload_reasons = []
-        if _model is None:
-            reload_reasons.append("model_uninitialized")
-        if _model_info["engine"] != engine:
-            reload_reasons.append("engine_changed")
-        if normalized_model_type != _model_info["model_type"]:
-            reload_reasons.append("model_type_changed")
-        if _model_info["sensevoice_model_id"] != sensevoice_model_id:
-            reload_reasons.append("sensevoice_model_id_changed")
-        if _model_info["sensevoice_vad_model"] != sensevoice_vad_model:
-            reload_reasons.append("sensevoice_vad_model_changed")
-        if (
-            _model_info["sensevoice_vad_max_single_segment_time_ms"]
-            != sensevoice_vad_max_single_segment_time_ms
-        ):
-            reload_reasons.append("sensevoice_vad_max_single_segment_time_ms_changed")
-        if _model_info["device"] != device:
-            reload_reasons.append("device_changed")
-        if _model_info["compute_type"] != compute_type:
-            reload_reasons.append("compute_type_changed")
-        if _model_info["download_root"] != download_root:
-            reload_reasons.append("download_root_changed")
+    # Lock-free fast path: _active_model pairs the active model with its key in
+    # one tuple, so a single read gives a consistent view. The identity check
+    # catches callers that reset _model directly (e.g. /model/unload).
+    active = _active_model
+    if active is not None and active[0] == model_args and active[1] is _model:
+        _log_model_reuse(engine, model_type, sensevoice_model_id, device, compute_type)
+        return active[1], True, "cache_hit"
 
+    with _model_lock:
+        reload_reasons = _collect_reload_reasons(*model_args)
         need_reload = len(reload_reasons) > 0
         reload_reason = ",".join(reload_reasons) if reload_reasons else "cache_hit"
 
         if need_reload:
-            if engine == "sensevoice":
+            new_model = _loaded_models.get(model_args)
+            if new_model is not None:
+                # Still resident from an earlier request: switch without reloading
+                need_reload = False
+                reload_reason = "lru_hit"
+                print(
+                    f"[Server] Switching to cached model: engine={engine}, model={model_type or sensevoice_model_id}, "
+                    f"device={device}, compute={compute_type}",
+                    flush=True,
+                )
+            elif engine == "sensevoice":
                 print(
                     f"[Server] Loading model: engine={engine}, model={sensevoice_model_id}, "
                     f"vad_model={sensevoice_vad_model or 'off'}, "
@@ -219,12 +455,13 @@ def get_model(
                     f"device={device}, compute={compute_type}",
                     flush=True,
                 )
-                _model = load_sensevoice_model(
+                new_model = load_sensevoice_model(
                     sensevoice_model_id,
                     device,
                     download_root,
                     sensevoice_vad_model=sensevoice_vad_model,
                     sensevoice_vad_max_single_segment_time_ms=sensevoice_vad_max_single_segment_time_ms,
+                    compute_type=compute_type,
                 )
             else:
                 print(
@@ -232,36 +469,47 @@ def get_model(
                     f"device={device}, compute={compute_type}",
                     flush=True,
                 )
-                _model = load_faster_whisper_model(model_type, device, compute_type, download_root)
-
-            _model_info.update(
-                {
-                    "engine": engine,
-                    "model_type": normalized_model_type,
-                    "sensevoice_model_id": sensevoice_model_id,
-                    "sensevoice_vad_model": sensevoice_vad_model,
-                    "sensevoice_vad_max_single_segment_time_ms": (
-                        sensevoice_vad_max_single_segment_time_ms
-                    ),
-                    "device": device,
-                    "compute_type": compute_type,
-                    "download_root": download_root,
-                }
-            )
-            print(f"[Server] Model loaded successfully (reload_reason={reload_reason})", flush=True)
+                new_model = load_faster_whisper_model(model_type, device, compute_type, download_root)
+
+            # Fresh CUDA models pay kernel selection on first use; do it before anyone waits on it
+            if need_reload:
+                warmup_model(new_model, engine, device)
+
+            _model_info.update(_model_info_for(model_args))
+            _model = new_model
+            _active_model = (model_args, new_model)
+            _model_state_version += 1
+            _loaded_models[model_args] = new_model
+            _resize_inference_executor(inference_worker_count(engine, device))
+            if need_reload:
+                print(f"[Server] Model loaded successfully (reload_reason={reload_reason})", flush=True)
         else:
-            model_name = model_type if engine == "faster-whisper" else sensevoice_model_id
+            _log_model_reuse(engine, model_type, sensevoice_model_id, device, compute_type)
+
+        _loaded_models.move_to_end(model_args)
+        max_loaded_models = max(1, _runtime_policy["max_loaded_models"])
+        while len(_loaded_models) > max_loaded_models:
+            evicted_args, evicted = _loaded_models.popitem(last=False)
+            # Drop the last reference so the weights (and any VRAM) are freed
+            del evicted
+            evicted_info = _model_info_for(evicted_args)
             print(
-                f"[Server] Reusing loaded model: engine={engine}, model={model_name}, "
-                f"device={device}, compute={compute_type}",
+                f"[Server] Evicted least recently used model: engine={evicted_info['engine']}, "
+                f"model={evicted_info['model_type'] or evicted_info['sensevoice_model_id']}, "
+                f"device={evicted_info['device']}, compute={evicted_info['compute_type']}",
                 flush=True,
             )
 
         return _model, (not need_reload), reload_reason
 
 
+# Fastest first: INT8 weights with FP16 activations use Tensor Cores at half the VRAM
+CUDA_COMPUTE_TYPE_PREFERENCE = ("int8_float16", "float16", "int8")
+
+
+@functools.lru_cache(maxsize=1)
 def detect_gpu():
-    """Detect CUDA availability."""
+    """Detect CUDA availability (cached; the device inventory is fixed for the process)."""
     result = {
         "cuda_available": False,
         "device_name": None,
@@ -270,6 +518,7 @@ def detect_gpu():
     }
 
     try:
+        add_nvidia_paths()
         import ctranslate2
 
         cuda_device_count = ctranslate2.get_cuda_device_count()
@@ -278,12 +527,42 @@ def detect_gpu():
             result["device_name"] = f"CUDA device (count: {cuda_device_count})"
             result["recommended_device"] = "cuda"
             result["recommended_compute_type"] = "float16"
+            try:
+                supported = ctranslate2.get_supported_compute_types("cuda", 0)
+            except Exception:
+                supported = ()
+            for compute_type in CUDA_COMPUTE_TYPE_PREFERENCE:
+                if compute_type in supported:
+                    result["recommended_compute_type"] = compute_type
+                    break
     except Exception:
         pass
 
     return result
 
 
+def resolve_compute_type(device: str, compute_type: str | None) -> str:
+    """Resolve an unset or "auto" compute type to the fastest one for the device."""
+    if compute_type and compute_type != "auto":
+        return compute_type
+    if device == "cuda":
+        gpu = detect_gpu()
+        return gpu["recommended_compute_type"] if gpu["cuda_available"] else "float16"
+    return "int8"
+
+
+def resolve_engine_compute_type(engine: str, device: str, compute_type: str | None) -> str:
+    """Resolve compute_type for an engine.
+
+    "auto" picks a CTranslate2 type for faster-whisper only. SenseVoice's value comes
+    from its own sensevoice_compute_type option and stays float32 unless set.
+    """
+    if engine == "sensevoice":
+        return compute_type if compute_type and compute_type != "auto" else "float32"
+    return resolve_compute_type(device, compute_type)
+
+
+@functools.lru_cache(maxsize=1)
 def collect_candidate_library_dirs():
     """Collect candidate library directories for NVIDIA runtime libs."""
     dirs = []
@@ -299,8 +578,6 @@ def collect_candidate_library_dirs():
 
     possible_site_packages = []
     try:
-        import site
-
         if hasattr(site, "getsitepackages"):
             possible_site_packages.extend(site.getsitepackages())
         if hasattr(site, "getusersitepackages"):
@@ -333,13 +610,29 @@ def collect_candidate_library_dirs():
 def find_first_library(candidate_dirs, patterns):
     """Find first library file matching any glob pattern under candidate dirs."""
     for directory in candidate_dirs:
+        # One directory read per candidate, matched against every pattern in order
+        try:
+            with os.scandir(directory) as entries:
+                names = [entry.name for entry in entries]
+        except OSError:
+            continue
         for pattern in patterns:
-            matches = sorted(glob.glob(os.path.join(directory, pattern)))
+            matches = sorted(fnmatch.filter(names, pattern))
             if matches:
-                return matches[0]
+                return os.path.join(directory, matches[0])
     return None
 
 
+@functools.lru_cache(maxsize=1)
+def resolve_runtime_libraries() -> dict:
+    """Locate cuBLAS/cuDNN once; scanning every candidate dir is the slow part."""
+    candidate_dirs = collect_candidate_library_dirs()
+    return {
+        "cublas": find_first_library(candidate_dirs, ["libcublas.so*", "libcublasLt.so*", "cublas64_*.dll"]),
+        "cudnn": find_first_library(candidate_dirs, ["libcudnn.so*", "cudnn64_*.dll"]),
+    }
+
+
 def log_runtime_library_diagnostics():
     """Log runtime library env and detected NVIDIA runtime libraries."""
     ld_library_path = os.environ.get("LD_LIBRARY_PATH", "")
@@ -356,20 +649,116 @@ def log_runtime_library_diagnostics():
         if len(candidate_dirs) > max_preview:
             print(f"[Server] LibDir: ... ({len(candidate_dirs) - max_preview} more)", flush=True)
 
-    cublas_path = find_first_library(candidate_dirs, ["libcublas.so*", "libcublasLt.so*", "cublas64_*.dll"])
-    cudnn_path = find_first_library(candidate_dirs, ["libcudnn.so*", "cudnn64_*.dll"])
+    libraries = resolve_runtime_libraries()
+    print(f"[Server] Resolved cuBLAS: {libraries['cublas'] or 'NOT FOUND'}", flush=True)
+    print(f"[Server] Resolved cuDNN: {libraries['cudnn'] or 'NOT FOUND'}", flush=True)
+
+
+def default_beam_size(model_type: str | None) -> int:
+    """Greedy decoding for tiny/base, where beam search buys little accuracy for ~3x the decode cost."""
+    return 1 if model_type in ("tiny", "base") else 5
 
-    print(f"[Server] Resolved cuBLAS: {cublas_path or 'NOT FOUND'}", flush=True)
-    print(f"[Server] Resolved cuDNN: {cudnn_path or 'NOT FOUND'}", flush=True)
 
+# Below this, auto mode skips VAD: clips this short are almost all speech
+VAD_AUTO_MIN_DURATION_S = 3.0
 
-def transcribe_with_faster_whisper(model, temp_path: str, language: str | None):
-    options = {"beam_size": 5, "vad_filter": True, "vad_parameters": {"min_silence_duration_ms": 500}}
+
+FASTER_WHISPER_VAD_PARAMETERS = {"min_silence_duration_ms": 500}
+
+
+@functools.lru_cache(maxsize=1)
+def faster_whisper_vad_options():
+    """Build faster-whisper's VadOptions once instead of re-parsing a dict per request."""
+    from faster_whisper.vad import VadOptions
+
+    return VadOptions(**FASTER_WHISPER_VAD_PARAMETERS)
+
+
+def resolve_vad_filter(vad_filter: bool | None, audio) -> bool:
+    """None means auto: skip Silero VAD for short decoded clips, which push-to-talk already trims."""
+    if vad_filter is not None:
+        return vad_filter
+    if isinstance(audio, np.ndarray):
+        return len(audio) / 16000 >= VAD_AUTO_MIN_DURATION_S
+    return True
+
+
+# Only clips long enough for several 30 s VAD chunks have anything to batch
+BATCHED_MIN_DURATION_S = 30.0
+
+
+def run_faster_whisper_transcribe(model, audio, options: dict):
+    """Call model.transcribe, batching a long clip's VAD chunks through BatchedInferencePipeline."""
+    batch_size = _runtime_policy["batch_size"]
+    if (
+        batch_size > 1
+        and options.get("vad_filter")
+        and isinstance(audio, np.ndarray)
+        and len(audio) / 16000 > BATCHED_MIN_DURATION_S
+    ):
+        try:
+            from faster_whisper import BatchedInferencePipeline
+
+            # The pipeline only holds a reference to the model, so building one per call is cheap
+            pipeline = BatchedInferencePipeline(model=model)
+            # The pipeline only caps speech spans at its 30 s chunk length when given a dict
+            # (which it mutates); a prebuilt VadOptions keeps max_speech_duration_s=inf and
+            # any longer span would be trimmed to 30 s, dropping the rest of the speech.
+            batched_options = {**options, "vad_parameters": dict(FASTER_WHISPER_VAD_PARAMETERS)}
+            return pipeline.transcribe(audio, batch_size=batch_size, **batched_options)
+        except (ImportError, TypeError) as exc:
+            # Older faster-whisper: no pipeline, or no batch_size/option support
+            print(f"[Server] Batched transcription unavailable, using sequential: {exc}", flush=True)
+    return model.transcribe(audio, **options)
+
+
+def transcribe_with_faster_whisper(
+    model,
+    audio,
+    language: str | None,
+    beam_size: int = 5,
+    on_segment=None,
+    vad_filter: bool | None = None,
+    best_of: int | None = None,
+):
+    """Transcribe with faster-whisper; audio may be a path, a file-like object or an array.
+
+    on_segment, if given, is called with {"text", "start", "end"} as each segment is decoded.
+    vad_filter=None enables VAD only for clips of at least VAD_AUTO_MIN_DURATION_S.
+    best_of (candidates sampled on temperature fallback) defaults to beam_size.
+    """
+    options = {
+        "beam_size": beam_size,
+        "best_of": best_of or beam_size,
+        "vad_filter": resolve_vad_filter(vad_filter, audio),
+    }
+    if options["vad_filter"]:
+        options["vad_parameters"] = faster_whisper_vad_options()
+    if beam_size == 1:
+        options["condition_on_previous_text"] = False
     if language and language != "auto":
         options["language"] = language
 
-    segments, info = model.transcribe(temp_path, **options)
-    text = " ".join(seg.text.strip() for seg in segments).strip()
+    segments, info = run_faster_whisper_transcribe(model, audio, options)
+    if info.duration < 0.1:
+        # Nothing to decode; don't start the generator at all
+        return {
+            "text": "",
+            "language": info.language,
+            "language_probability": info.language_probability,
+            "duration": info.duration,
+        }
+
+    segment_texts = []
+    for seg in segments:
+        segment_text = seg.text.strip()
+        if not segment_text:
+            continue
+        segment_texts.append(segment_text)
+        if on_segment is not None:
+            on_segment({"text": segment_text, "start": seg.start, "end": seg.end})
+    # Pieces are already stripped and non-empty, so the join needs no final strip
+    text = " ".join(segment_texts)
     return {
         "text": text,
         "language": info.language,
@@ -378,20 +767,46 @@ def transcribe_with_faster_whisper(model, temp_path: str, language: str | None):
     }
 
 
+def warmup_model(model, engine: str, device: str):
+    """Run a second of silence through a CUDA model so kernel selection happens before the first request."""
+    if device != "cuda":
+        return
+    silent = np.zeros(16000, dtype=np.float32)
+    start_time = time.time()
+    try:
+        if engine == "sensevoice":
+            sensevoice_generate(model, input=silent, cache={}, language="auto", use_itn=False, batch_size_s=1)
+        else:
+            # Greedy and beam search run differently shaped kernels; prime both
+            for beam_size in (1, 5):
+                segments, _ = model.transcribe(silent, beam_size=beam_size, vad_filter=False)
+                list(segments)
+    except Exception as exc:
+        print(f"[Server] Warmup skipped: {exc}", flush=True)
+        return
+    print(f"[Server] Warmup complete in {time.time() - start_time:.2f}s", flush=True)
+
+
+@functools.lru_cache(maxsize=1)
+def sensevoice_postprocess():
+    """Import funasr's rich-transcription postprocessor once instead of on every request."""
+    from funasr.utils.postprocess_utils import rich_transcription_postprocess
+
+    return rich_transcription_postprocess
+
+
 def transcribe_with_sensevoice(
     model,
-    temp_path: str,
+    audio,
     language: str | None,
     sensevoice_use_itn: bool,
     sensevoice_vad_merge: bool,
     sensevoice_vad_merge_length_s: float,
     output_word_timestamps: bool,
 ):
-    from funasr.utils.postprocess_utils import rich_transcription_postprocess
-
     final_language = language if language and language != "auto" else "auto"
     options = {
-        "input": temp_path,
+        "input": audio,
         "cache": {},
         "language": final_language,
         "use_itn": sensevoice_use_itn,
@@ -402,7 +817,8 @@ def transcribe_with_sensevoice(
         options["merge_vad"] = True
         if isinstance(sensevoice_vad_merge_length_s, (int, float)) and sensevoice_vad_merge_length_s > 0:
             options["merge_length_s"] = float(sensevoice_vad_merge_length_s)
-    result = model.generate(
+    result = sensevoice_generate(
+        model,
         **options,
     )
 
@@ -418,7 +834,7 @@ def transcribe_with_sensevoice(
     elif item is not None:
         text_raw = str(item)
 
-    text = rich_transcription_postprocess(text_raw) if text_raw else ""
+    text = sensevoice_postprocess()(text_raw) if text_raw else ""
     detected_language = None
     word_timings = None
     if isinstance(item, dict):
@@ -468,7 +884,32 @@ def transcribe_audio_bytes(
     sensevoice_vad_merge: bool,
     sensevoice_vad_merge_length_s: float,
     output_word_timestamps: bool,
+    beam_size: int = 5,
+    on_segment=None,
+    vad_filter: bool | None = None,
+    best_of: int | None = None,
 ) -> dict:
+    # 16 kHz PCM16 WAV (what our clients send) is decoded here in one pass and
+    # handed to either engine as a float32 array, with no temp file or ffmpeg.
+    audio = decode_wav_to_float32(audio_data)
+    if engine != "sensevoice":
+        # Anything else goes to faster-whisper's own decoder as a file-like object
+        if audio is None:
+            audio = io.BytesIO(audio_data)
+        return transcribe_with_faster_whisper(model, audio, language, beam_size, on_segment, vad_filter, best_of)
+
+    if audio is not None:
+        return transcribe_with_sensevoice(
+            model,
+            audio,
+            language,
+            sensevoice_use_itn,
+            sensevoice_vad_merge,
+            sensevoice_vad_merge_length_s,
+            output_word_timestamps,
+        )
+
+    # funasr needs a path to decode other containers itself
     with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
         tmp_file.write(audio_data)
         temp_path = tmp_file.name
@@ -507,6 +948,10 @@ def transcribe_audio_offline_segmented(
     padding_ms: int,
     max_segment_ms: int,
     overlap_ms: int,
+    beam_size: int = 5,
+    on_segment=None,
+    vad_filter: bool | None = None,
+    best_of: int | None = None,
 ) -> dict:
     decoded = decode_wav_to_mono_pcm16(audio_data)
     if not decoded:
@@ -556,6 +1001,9 @@ def transcribe_audio_offline_segmented(
             sensevoice_vad_merge=sensevoice_vad_merge,
             sensevoice_vad_merge_length_s=sensevoice_vad_merge_length_s,
             output_word_timestamps=output_word_timestamps,
+            beam_size=beam_size,
+            vad_filter=vad_filter,
+            best_of=best_of,
         )
         segment_text = str(segment_payload.get("text") or "").strip()
         segment_word_timings = offset_word_timings(
@@ -570,6 +1018,14 @@ def transcribe_audio_offline_segmented(
 
         if segment_text:
             merged_text = merge_text(merged_text, segment_text)
+            if on_segment is not None:
+                on_segment(
+                    {
+                        "text": segment_text,
+                        "start": round(start_sample / sample_rate, 3),
+                        "end": round(end_sample / sample_rate, 3),
+                    }
+                )
         if isinstance(segment_word_timings, list) and segment_word_timings:
             merged_word_timings.extend(segment_word_timings)
         if segment_payload.get("language"):
@@ -595,7 +1051,24 @@ def transcribe_audio_offline_segmented(
     }
 
 
-def transcribe_audio_payload(audio_data: bytes, params: dict) -> dict:
+def _result_cache_get(key: tuple) -> dict | None:
+    with _result_cache_lock:
+        payload = _result_cache.get(key)
+        if payload is not None:
+            _result_cache.move_to_end(key)
+        return payload
+
+
+def _result_cache_put(key: tuple, payload: dict):
+    with _result_cache_lock:
+        _result_cache[key] = payload
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > RESULT_CACHE_MAX_ENTRIES:
+            _result_cache.popitem(last=False)
+
+
+def transcribe_audio_payload(audio_data: bytes, params: dict, on_segment=None, use_cache: bool = False) -> dict:
+    """Transcribe one request; on_segment receives corrected segments as they are decoded."""
     start_time = time.time()
 
     default_engine = _model_info["engine"] or _runtime_policy["engine"] or "faster-whisper"
@@ -616,34 +1089,6 @@ def transcribe_audio_payload(audio_data: bytes, params: dict) -> dict:
     default_sensevoice_vad_merge_length_s = _runtime_policy["sensevoice_vad_merge_length_s"]
     default_download_root = _model_info["download_root"] or _runtime_policy["download_root"]
 
-    requested_engine = params.get("engine", [default_engine])[0]
-    requested_model_type = params.get("model", [default_model_type])[0]
-    requested_sensevoice_model_id = params.get("sensevoice_model_id", [default_sensevoice_model_id])[0]
-    requested_sensevoice_use_itn = parse_bool(
-        params.get("sensevoice_use_itn", [default_sensevoice_use_itn])[0],
-        default_sensevoice_use_itn,
-    )
-    requested_sensevoice_vad_model = (
-        params.get("sensevoice_vad_model", [default_sensevoice_vad_model])[0] or None
-    )
-    requested_sensevoice_vad_merge = parse_bool(
-        params.get("sensevoice_vad_merge", [default_sensevoice_vad_merge])[0],
-        default_sensevoice_vad_merge,
-    )
-    requested_sensevoice_vad_merge_length_s = float(
-        params.get("sensevoice_vad_merge_length_s", [default_sensevoice_vad_merge_length_s])[0]
-        or default_sensevoice_vad_merge_length_s
-    )
-    requested_sensevoice_vad_max_single_segment_time_ms = parse_positive_int(
-        params.get(
-            "sensevoice_vad_max_single_segment_time_ms",
-            [default_sensevoice_vad_max_single_segment_time_ms],
-        )[0],
-        default_sensevoice_vad_max_single_segment_time_ms,
-    )
-    requested_device = params.get("device", [default_device])[0]
-    requested_compute_type = params.get("compute_type", [default_compute_type])[0]
-    requested_language = params.get("language", [default_language])[0]
     download_root = params.get("download_root", [default_download_root])[0]
     output_word_timestamps = parse_bool(params.get("return_word_timestamps", ["false"])[0], False)
     offline_segmented = parse_bool(params.get("offline_segmented", ["false"])[0], False)
@@ -658,7 +1103,16 @@ def transcribe_audio_payload(audio_data: bytes, params: dict) -> dict:
     )
     offline_segment_overlap_ms = int(params.get("offline_segment_overlap_ms", ["640"])[0] or 640)
     text_corrections = parse_text_corrections(params.get("text_corrections", [None])[0])
+    requested_beam_size = params.get("beam_size", [None])[0]
+    requested_best_of = params.get("best_of", [None])[0]
+    requested_vad = params.get("vad", [None])[0]
+    # "auto" (the default) leaves the choice to the clip length
+    if requested_vad is None or str(requested_vad).strip().lower() in ("", "auto"):
+        vad_filter = None
+    else:
+        vad_filter = parse_bool(requested_vad, True)
 
+    # Locked settings skip parsing the request's values entirely
     if _runtime_policy["lock_model"]:
         engine = default_engine
         model_type = default_model_type if default_engine == "faster-whisper" else None
@@ -669,78 +1123,168 @@ def transcribe_audio_payload(audio_data: bytes, params: dict) -> dict:
         sensevoice_vad_merge_length_s = default_sensevoice_vad_merge_length_s
         sensevoice_vad_max_single_segment_time_ms = default_sensevoice_vad_max_single_segment_time_ms
     else:
-        engine = requested_engine
-        model_type = requested_model_type if engine == "faster-whisper" else None
-        sensevoice_model_id = requested_sensevoice_model_id
-        sensevoice_use_itn = requested_sensevoice_use_itn
-        sensevoice_vad_model = requested_sensevoice_vad_model
-        sensevoice_vad_merge = requested_sensevoice_vad_merge
-        sensevoice_vad_merge_length_s = requested_sensevoice_vad_merge_length_s
-        sensevoice_vad_max_single_segment_time_ms = requested_sensevoice_vad_max_single_segment_time_ms
+        engine = params.get("engine", [default_engine])[0]
+        model_type = params.get("model", [default_model_type])[0] if engine == "faster-whisper" else None
+        sensevoice_model_id = params.get("sensevoice_model_id", [default_sensevoice_model_id])[0]
+        sensevoice_use_itn = parse_bool(
+            params.get("sensevoice_use_itn", [default_sensevoice_use_itn])[0],
+            default_sensevoice_use_itn,
+        )
+        sensevoice_vad_model = params.get("sensevoice_vad_model", [default_sensevoice_vad_model])[0] or None
+        sensevoice_vad_merge = parse_bool(
+            params.get("sensevoice_vad_merge", [default_sensevoice_vad_merge])[0],
+            default_sensevoice_vad_merge,
+        )
+        sensevoice_vad_merge_length_s = float(
+            params.get("sensevoice_vad_merge_length_s", [default_sensevoice_vad_merge_length_s])[0]
+            or default_sensevoice_vad_merge_length_s
+        )
+        sensevoice_vad_max_single_segment_time_ms = parse_positive_int(
+            params.get(
+                "sensevoice_vad_max_single_segment_time_ms",
+                [default_sensevoice_vad_max_single_segment_time_ms],
+            )[0],
+            default_sensevoice_vad_max_single_segment_time_ms,
+        )
 
     if _runtime_policy["lock_language"]:
         language = default_language
     else:
-        language = requested_language
+        language = params.get("language", [default_language])[0]
 
     if not sensevoice_vad_model:
         sensevoice_vad_merge = False
 
+    if engine == "sensevoice":
+        # SenseVoice precision has its own option: clients send compute_type for
+        # faster-whisper, and that CTranslate2 choice must not quantize SenseVoice
+        compute_type_param = "sensevoice_compute_type"
+        policy_compute_type = _runtime_policy["sensevoice_compute_type"]
+        if _model_info["engine"] == "sensevoice":
+            default_compute_type = _model_info["compute_type"]
+        else:
+            default_compute_type = policy_compute_type
+    else:
+        compute_type_param = "compute_type"
+        policy_compute_type = _runtime_policy["compute_type"]
+
     if _runtime_policy["lock_device_compute"]:
         requested_device = _runtime_policy["device"]
-        compute_type = _runtime_policy["compute_type"]
+        compute_type = policy_compute_type
     else:
-        compute_type = requested_compute_type
+        requested_device = params.get("device", [default_device])[0]
+        compute_type = params.get(compute_type_param, [default_compute_type])[0] or default_compute_type
 
     if engine == "sensevoice":
         resolved_sensevoice_device = resolve_sensevoice_device(requested_device)
         device = "cuda" if resolved_sensevoice_device.startswith("cuda") else "cpu"
     else:
         device = requested_device
+    compute_type = resolve_engine_compute_type(engine, device, compute_type)
+
+    beam_size = parse_positive_int(requested_beam_size, default_beam_size(model_type))
+    best_of = parse_positive_int(requested_best_of, beam_size)
 
     ensure_download_env(download_root)
 
-    try:
-        model, model_reused, reload_reason = get_model(
-            engine=engine,
-            model_type=model_type,
-            sensevoice_model_id=sensevoice_model_id,
-            sensevoice_vad_model=sensevoice_vad_model,
-            sensevoice_vad_max_single_segment_time_ms=sensevoice_vad_max_single_segment_time_ms,
-            device=device,
-            compute_type=compute_type,
-            download_root=download_root,
+    segment_callback = None
+    if on_segment is not None:
+
+        def segment_callback(segment: dict):
+            corrected_segment_text, _ = apply_text_corrections(segment["text"], text_corrections)
+            on_segment({**segment, "text": corrected_segment_text})
+
+    # Desktop clients retry identical clips on network hiccups; answer those
+    # from the cache without touching the model. Streaming callers need the
+    # per-segment callbacks, so they always transcribe.
+    cache_key = None
+    if use_cache and on_segment is None:
+        cache_key = (
+            hashlib.blake2b(audio_data, digest_size=16).digest(),
+            engine,
+            model_type,
+            sensevoice_model_id,
+            sensevoice_use_itn,
+            sensevoice_vad_model,
+            sensevoice_vad_merge,
+            sensevoice_vad_merge_length_s,
+            sensevoice_vad_max_single_segment_time_ms,
+            device,
+            compute_type,
+            language,
+            beam_size,
+            best_of,
+            vad_filter,
+            output_word_timestamps,
+            offline_segmented
+            and (
+                offline_segment_silence_ms,
+                offline_segment_min_speech_rms,
+                offline_segment_window_ms,
+                offline_segment_padding_ms,
+                offline_segment_max_segment_ms,
+                offline_segment_overlap_ms,
+            ),
         )
 
-        if offline_segmented:
-            payload = transcribe_audio_offline_segmented(
-                model,
-                engine=engine,
-                audio_data=audio_data,
-                language=language,
-                sensevoice_use_itn=sensevoice_use_itn,
-                sensevoice_vad_merge=sensevoice_vad_merge,
-                sensevoice_vad_merge_length_s=sensevoice_vad_merge_length_s,
-                output_word_timestamps=output_word_timestamps,
-                silence_ms=max(60, offline_segment_silence_ms),
-                min_speech_rms=max(50, offline_segment_min_speech_rms),
-                analysis_window_ms=max(10, offline_segment_window_ms),
-                padding_ms=max(0, offline_segment_padding_ms),
-                max_segment_ms=max(1000, offline_segment_max_segment_ms),
-                overlap_ms=max(0, offline_segment_overlap_ms),
-            )
+    try:
+        payload = _result_cache_get(cache_key) if cache_key is not None else None
+        if payload is not None:
+            model_reused, reload_reason = True, "result_cache_hit"
         else:
-            payload = transcribe_audio_bytes(
-                model,
+            model, model_reused, reload_reason = get_model(
                 engine=engine,
-                audio_data=audio_data,
-                language=language,
-                sensevoice_use_itn=sensevoice_use_itn,
-                sensevoice_vad_merge=sensevoice_vad_merge,
-                sensevoice_vad_merge_length_s=sensevoice_vad_merge_length_s,
-                output_word_timestamps=output_word_timestamps,
+                model_type=model_type,
+                sensevoice_model_id=sensevoice_model_id,
+                sensevoice_vad_model=sensevoice_vad_model,
+                sensevoice_vad_max_single_segment_time_ms=sensevoice_vad_max_single_segment_time_ms,
+                device=device,
+                compute_type=compute_type,
+                download_root=download_root,
             )
 
+            if offline_segmented:
+                payload = run_inference(
+                    transcribe_audio_offline_segmented,
+                    model,
+                    engine=engine,
+                    audio_data=audio_data,
+                    language=language,
+                    sensevoice_use_itn=sensevoice_use_itn,
+                    sensevoice_vad_merge=sensevoice_vad_merge,
+                    sensevoice_vad_merge_length_s=sensevoice_vad_merge_length_s,
+                    output_word_timestamps=output_word_timestamps,
+                    silence_ms=max(60, offline_segment_silence_ms),
+                    min_speech_rms=max(50, offline_segment_min_speech_rms),
+                    analysis_window_ms=max(10, offline_segment_window_ms),
+                    padding_ms=max(0, offline_segment_padding_ms),
+                    max_segment_ms=max(1000, offline_segment_max_segment_ms),
+                    overlap_ms=max(0, offline_segment_overlap_ms),
+                    beam_size=beam_size,
+                    on_segment=segment_callback,
+                    vad_filter=vad_filter,
+                    best_of=best_of,
+                )
+            else:
+                payload = run_inference(
+                    transcribe_audio_bytes,
+                    model,
+                    engine=engine,
+                    audio_data=audio_data,
+                    language=language,
+                    sensevoice_use_itn=sensevoice_use_itn,
+                    sensevoice_vad_merge=sensevoice_vad_merge,
+                    sensevoice_vad_merge_length_s=sensevoice_vad_merge_length_s,
+                    output_word_timestamps=output_word_timestamps,
+                    beam_size=beam_size,
+                    on_segment=segment_callback,
+                    vad_filter=vad_filter,
+                    best_of=best_of,
+                )
+
+            if cache_key is not None and payload.get("success") is not False:
+                _result_cache_put(cache_key, payload)
+
         if payload.get("success") is False:
             raise RuntimeError(payload.get("error") or "transcription_failed")
 
@@ -766,6 +1310,15 @@ def transcribe_audio_payload(audio_data: bytes, params: dict) -> dict:
             "offline_segments": payload.get("offline_segments"),
             "word_timings": None if corrected else payload.get("word_timings"),
         }
+    except InferenceOverloadedError as exc:
+        print(f"[Server] Transcribe rejected: {exc}", flush=True)
+        return {
+            "success": False,
+            "text": "",
+            "error": str(exc),
+            "overloaded": True,
+            "processing_time": time.time() - start_time,
+        }
     except Exception as exc:
         model_name = model_type if engine == "faster-whisper" else sensevoice_model_id
         print(
@@ -1,10 +1,23 @@
 import array
+import functools
 import io
 import math
 import struct
 import sys
 import wave
 
+import numpy as np
+
+
+@functools.lru_cache(maxsize=1)
+def load_resample_poly():
+    """Import scipy's resampler on the first off-rate WAV; None when scipy is missing."""
+    try:
+        from scipy.signal import resample_poly
+    except ImportError:
+        return None
+    return resample_poly
+
 
 def build_word_timings(words, timestamps):
     if not isinstance(words, list) or not isinstance(timestamps, list):
@@ -79,6 +92,42 @@ def decode_wav_to_mono_pcm16(audio_data: bytes) -> dict | None:
     }
 
 
+def decode_wav_to_float32(audio_data: bytes, sample_rate: int = 16000) -> np.ndarray | None:
+    """Decode a PCM16 WAV into a mono float32 array in [-1, 1) at sample_rate.
+
+    Other rates are resampled when scipy is available. Returns None for anything
+    else so callers can fall back to a full decoder.
+    """
+    try:
+        with wave.open(io.BytesIO(audio_data), "rb") as wav_file:
+            channel_count = wav_file.getnchannels()
+            source_rate = wav_file.getframerate()
+            if channel_count <= 0 or wav_file.getsampwidth() != 2 or source_rate <= 0:
+                return None
+            resample_poly = None
+            if source_rate != sample_rate:
+                # Only off-rate input pays for importing scipy
+                resample_poly = load_resample_poly()
+                if resample_poly is None:
+                    return None
+            raw_frames = wav_file.readframes(wav_file.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    samples = np.frombuffer(raw_frames, dtype="<i2")
+    if channel_count > 1:
+        usable = len(samples) - len(samples) % channel_count
+        samples = samples[:usable].reshape(-1, channel_count).mean(axis=1)
+    if samples.size == 0:
+        return None
+    audio = samples.astype(np.float32) / 32768.0
+    if source_rate != sample_rate:
+        # Polyphase filtering with the reduced up/down ratio, e.g. 44100 -> 16000 is 160/441
+        divisor = math.gcd(source_rate, sample_rate)
+        audio = resample_poly(audio, sample_rate // divisor, source_rate // divisor).astype(np.float32)
+    return audio
+
+
 def encode_wav_pcm16_mono(pcm_mono: bytes, sample_rate: int) -> bytes:
     buffer = io.BytesIO()
     with wave.open(buffer, "wb") as wav_file:
@@ -0,0 +1,94 @@
+"""Process setup shared by the HTTP/WS server and the one-shot CLI."""
+
+import functools
+import glob
+import os
+import site
+import sys
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+@functools.lru_cache(maxsize=1)
+def add_nvidia_paths():
+    """Add NVIDIA library paths to DLL search path for Windows.
+
+    Called (once, via the cache) right before the first CUDA-capable import
+    rather than at module import, so startup doesn't pay for the scan.
+    Shared by the server and the CLI, which may both ask for it in one run.
+    """
+    if os.name != "nt":
+        return
+
+    possible_paths = site.getsitepackages() if hasattr(site, "getsitepackages") else []
+    for path in sys.path:
+        if "site-packages" in path and os.path.isdir(path) and path not in possible_paths:
+            possible_paths.append(path)
+
+    for site_packages in possible_paths:
+        nvidia_path = os.path.join(site_packages, "nvidia")
+        if not os.path.isdir(nvidia_path):
+            continue
+
+        path_entries = set(os.environ.get("PATH", "").split(os.pathsep))
+        with os.scandir(nvidia_path) as entries:
+            for entry in entries:
+                bin_path = os.path.join(entry.path, "bin")
+                if not entry.is_dir() or not os.path.isdir(bin_path):
+                    continue
+                try:
+                    os.add_dll_directory(bin_path)
+                except Exception:
+                    pass
+                if bin_path not in path_entries:
+                    os.environ["PATH"] = bin_path + os.pathsep + os.environ.get("PATH", "")
+                    path_entries.add(bin_path)
+        return
+
+
+def usable_cpu_count() -> int:
+    """CPUs this process may run on, honouring affinity masks where the OS exposes them."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+@functools.lru_cache(maxsize=1)
+def physical_cpu_count() -> int | None:
+    """Physical cores on the host, or None when the topology can't be read."""
+    if psutil is not None:
+        count = psutil.cpu_count(logical=False)
+        if count:
+            return count
+    # Linux without psutil: each distinct sibling list is one core
+    sibling_lists = set()
+    for path in glob.glob("/sys/devices/system/cpu/cpu[0-9]*/topology/thread_siblings_list"):
+        try:
+            with open(path, encoding="utf-8") as f:
+                sibling_lists.add(f.read().strip())
+        except OSError:
+            return None
+    return len(sibling_lists) or None
+
+
+def default_cpu_threads(requested: int | None = None) -> int:
+    """CTranslate2 compute threads for CPU inference: the override, else one per physical core."""
+    if requested:
+        return max(1, requested)
+    usable = usable_cpu_count()
+    physical = physical_cpu_count()
+    logical = os.cpu_count()
+    if not physical or not logical:
+        return max(1, usable)
+    # int8 GEMMs gain nothing from a core's sibling hyperthread; scale to the affinity mask
+    return max(1, usable * physical // logical)
+
+
+def limit_openmp_threads(threads: int):
+    """Default the OpenMP/MKL pool size; must run before CTranslate2 initializes OpenMP."""
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+    os.environ.setdefault("MKL_NUM_THREADS", str(threads))
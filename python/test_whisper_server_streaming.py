@@ -1,14 +1,34 @@
+import io
+import http.client
 import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
 import time
 import unittest
+from argparse import Namespace
 from array import array
 from unittest.mock import patch
 
+import numpy as np
+
+import asr_engine
+import runtime_env
+import whisper_service
 from asr_engine import (
+    InferenceOverloadedError,
+    get_model,
+    list_loaded_models,
+    resolve_compute_type,
+    resolve_vad_filter,
+    run_faster_whisper_transcribe,
+    run_inference,
     transcribe_audio_offline_segmented,
     transcribe_audio_payload,
 )
-from audio_utils import build_wav_from_pcm, detect_offline_segments
+from audio_utils import build_wav_from_pcm, decode_wav_to_float32, detect_offline_segments
 from text_processing import (
     accumulate_preview_text,
     apply_text_corrections,
@@ -24,6 +44,16 @@ from text_processing import (
     trim_latin_stable_prefix,
 )
 from transcript_assembler import TranscriptAssembler
+from whisper_server import (
+    ThreadedHTTPServer,
+    WhisperHandler,
+    dumps_json,
+    loads_json,
+    parse_multipart_boundary,
+    parse_multipart_form_data,
+    read_multipart_form_data,
+)
+from worker_pool import DaemonThreadPool
 from ws_streaming import WebSocketStreamingSession
 
 
@@ -329,6 +359,707 @@ class OfflineSegmentedTranscribeTests(unittest.TestCase):
         self.assertEqual(len(result["offline_segments"]), 2)
 
 
+class ModelCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._model_state_version = asr_engine._model_state_version
+        self._inference_workers = asr_engine._inference_workers
+
+    def tearDown(self):
+        asr_engine._model = None
+        asr_engine._active_model = None
+        asr_engine._model_state_version = self._model_state_version
+        asr_engine._loaded_models.clear()
+        asr_engine._result_cache.clear()
+        for key in asr_engine._model_info:
+            asr_engine._model_info[key] = None
+        asr_engine._resize_inference_executor(self._inference_workers)
+
+    def test_default_app_request_leaves_sensevoice_unquantized(self):
+        original = object()
+
+        def load_sensevoice_model(*_args, compute_type=None, **_kwargs):
+            model = type("FakeAutoModel", (), {})()
+            model.model = original
+            asr_engine.apply_sensevoice_compute_type(model, "cpu", compute_type)
+            return model
+
+        with (
+            patch("asr_engine.load_sensevoice_model", side_effect=load_sensevoice_model),
+            patch(
+                "asr_engine.transcribe_audio_bytes",
+                return_value={"success": True, "text": "hi", "language": "en", "word_timings": None},
+            ),
+        ):
+            # The Electron client sends its faster-whisper compute_type for every engine
+            result = transcribe_audio_payload(
+                b"fake-wav", {"engine": ["sensevoice"], "device": ["cpu"], "compute_type": ["int8"]}
+            )
+
+        self.assertEqual(result["compute_type"], "float32")
+        self.assertIs(asr_engine._model.model, original)
+        self.assertIsNone(asr_engine._model.autocast_dtype)
+
+    def test_get_model_switches_between_cached_variants_and_evicts_lru(self):
+        with patch("asr_engine.load_faster_whisper_model", side_effect=lambda *_args: object()) as load, patch.dict(
+            asr_engine._runtime_policy, {"max_loaded_models": 2}
+        ):
+            base, _, _ = get_model("faster-whisper", "base", "", None, None, "cpu", "int8", None)
+            get_model("faster-whisper", "small", "", None, None, "cpu", "int8", None)
+            model, reused, reason = get_model("faster-whisper", "base", "", None, None, "cpu", "int8", None)
+            get_model("faster-whisper", "tiny", "", None, None, "cpu", "int8", None)
+
+        self.assertIs(model, base)
+        self.assertTrue(reused)
+        self.assertEqual(reason, "lru_hit")
+        self.assertEqual(load.call_count, 3)
+        self.assertEqual([info["model_type"] for info in list_loaded_models()], ["base", "tiny"])
+        self.assertEqual([info["active"] for info in list_loaded_models()], [False, True])
+
+
+class ResultCacheTests(unittest.TestCase):
+    def tearDown(self):
+        asr_engine._result_cache.clear()
+
+    def test_identical_audio_and_options_are_served_from_cache(self):
+        with (
+            patch("asr_engine.get_model", return_value=(object(), True, "cache_hit")),
+            patch(
+                "asr_engine.transcribe_audio_bytes",
+                return_value={"success": True, "text": "hello", "language": "en", "word_timings": None},
+            ) as mock_transcribe_audio_bytes,
+        ):
+            first = transcribe_audio_payload(b"RIFF-audio", {"language": ["en"]}, use_cache=True)
+            second = transcribe_audio_payload(b"RIFF-audio", {"language": ["en"]}, use_cache=True)
+            transcribe_audio_payload(b"RIFF-audio", {"language": ["zh"]}, use_cache=True)
+
+        self.assertEqual(mock_transcribe_audio_bytes.call_count, 2)
+        self.assertEqual(second["text"], first["text"])
+        self.assertEqual(second["reload_reason"], "result_cache_hit")
+
+
+class InferenceQueueTests(unittest.TestCase):
+    def test_run_inference_rejects_calls_beyond_pending_limit(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking_call():
+            started.set()
+            release.wait(5)
+            return "done"
+
+        with patch.dict(asr_engine._runtime_policy, {"max_pending_inference": 1}):
+            worker = threading.Thread(target=run_inference, args=(blocking_call,))
+            worker.start()
+            started.wait(5)
+            with self.assertRaises(InferenceOverloadedError):
+                run_inference(lambda: None)
+            release.set()
+            worker.join(5)
+            self.assertEqual(run_inference(lambda: "ok"), "ok")
+
+    def test_run_inference_survives_concurrent_pool_resizes(self):
+        self.addCleanup(asr_engine._resize_inference_executor, 1)
+        # Switch threads as often as possible to widen the read-then-submit window
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+        errors = []
+        stop = threading.Event()
+
+        def caller():
+            while not stop.is_set():
+                try:
+                    run_inference(lambda: None)
+                except InferenceOverloadedError:
+                    pass
+                except RuntimeError as exc:
+                    errors.append(exc)
+
+        with patch.dict(asr_engine._runtime_policy, {"max_pending_inference": 64}), patch("builtins.print"):
+            callers = [threading.Thread(target=caller) for _ in range(4)]
+            for thread in callers:
+                thread.start()
+            for index in range(2000):
+                asr_engine._resize_inference_executor(1 + index % 2)
+            stop.set()
+            for thread in callers:
+                thread.join(5)
+
+        self.assertEqual(errors, [])
+
+
+class VadFilterTests(unittest.TestCase):
+    def test_auto_vad_skips_short_decoded_clips(self):
+        self.assertFalse(resolve_vad_filter(None, np.zeros(16000, dtype=np.float32)))
+        self.assertTrue(resolve_vad_filter(None, np.zeros(16000 * 5, dtype=np.float32)))
+        self.assertTrue(resolve_vad_filter(None, io.BytesIO(b"")))
+        self.assertTrue(resolve_vad_filter(True, np.zeros(160, dtype=np.float32)))
+        self.assertFalse(resolve_vad_filter(False, np.zeros(16000 * 5, dtype=np.float32)))
+
+
+class BatchedTranscribeTests(unittest.TestCase):
+    def test_long_clips_use_batched_pipeline_and_short_clips_do_not(self):
+        class FakePipeline:
+            calls = []
+
+            def __init__(self, model):
+                self.model = model
+
+            def transcribe(self, audio, **options):
+                FakePipeline.calls.append(options["batch_size"])
+                FakePipeline.vad_parameters = options.get("vad_parameters")
+                return "batched"
+
+        class FakeModel:
+            def transcribe(self, audio, **options):
+                return "sequential"
+
+        fake_module = type(sys)("faster_whisper")
+        fake_module.BatchedInferencePipeline = FakePipeline
+        long_clip = np.zeros(16000 * 60, dtype=np.float32)
+        short_clip = np.zeros(16000 * 5, dtype=np.float32)
+        with patch.dict(sys.modules, {"faster_whisper": fake_module}), patch.dict(
+            asr_engine._runtime_policy, {"batch_size": 4}
+        ):
+            cached_vad_options = object()
+            self.assertEqual(
+                run_faster_whisper_transcribe(
+                    FakeModel(), long_clip, {"vad_filter": True, "vad_parameters": cached_vad_options}
+                ),
+                "batched",
+            )
+            self.assertEqual(run_faster_whisper_transcribe(FakeModel(), short_clip, {"vad_filter": True}), "sequential")
+
+        self.assertEqual(FakePipeline.calls, [4])
+        # A dict, so faster-whisper caps speech spans at the 30 s chunk length instead of truncating
+        self.assertEqual(FakePipeline.vad_parameters, asr_engine.FASTER_WHISPER_VAD_PARAMETERS)
+        self.assertIsNot(FakePipeline.vad_parameters, asr_engine.FASTER_WHISPER_VAD_PARAMETERS)
+
+
+class ComputeTypeResolutionTests(unittest.TestCase):
+    def test_auto_compute_type_uses_device_recommendation(self):
+        gpu = {"cuda_available": True, "recommended_compute_type": "int8_float16"}
+        with patch("asr_engine.detect_gpu", return_value=gpu):
+            self.assertEqual(resolve_compute_type("cuda", "auto"), "int8_float16")
+            self.assertEqual(resolve_compute_type("cuda", None), "int8_float16")
+        self.assertEqual(resolve_compute_type("cpu", "auto"), "int8")
+        self.assertEqual(resolve_compute_type("cuda", "float32"), "float32")
+
+    def test_sensevoice_keeps_fp32_unless_a_type_is_requested(self):
+        self.assertEqual(asr_engine.resolve_engine_compute_type("sensevoice", "cpu", "auto"), "float32")
+        self.assertEqual(asr_engine.resolve_engine_compute_type("sensevoice", "cpu", None), "float32")
+        self.assertEqual(asr_engine.resolve_engine_compute_type("sensevoice", "cpu", "int8"), "int8")
+        self.assertEqual(asr_engine.resolve_engine_compute_type("faster-whisper", "cpu", "auto"), "int8")
+
+        model = type("FakeAutoModel", (), {})()
+        model.model = original = object()
+        asr_engine.apply_sensevoice_compute_type(model, "cpu", "float32")
+        self.assertIs(model.model, original)
+        self.assertIsNone(model.autocast_dtype)
+
+    def test_sensevoice_precision_comes_from_its_own_option(self):
+        with (
+            patch.dict(asr_engine._model_info, {"engine": "faster-whisper", "compute_type": "int8"}),
+            patch("asr_engine.get_model", return_value=(object(), True, "cache_hit")) as mock_get_model,
+            patch(
+                "asr_engine.transcribe_audio_bytes",
+                return_value={"success": True, "text": "hi", "language": "en", "word_timings": None},
+            ),
+        ):
+            transcribe_audio_payload(b"fake-wav", {"engine": ["sensevoice"], "device": ["cpu"], "compute_type": ["int8"]})
+            transcribe_audio_payload(
+                b"fake-wav", {"engine": ["sensevoice"], "device": ["cpu"], "sensevoice_compute_type": ["int8"]}
+            )
+
+        self.assertEqual(mock_get_model.call_args_list[0].kwargs["compute_type"], "float32")
+        self.assertEqual(mock_get_model.call_args_list[1].kwargs["compute_type"], "int8")
+
+
+class AudioDecodeTests(unittest.TestCase):
+    def test_decode_wav_to_float32_scales_pcm16_samples(self):
+        samples = array("h", [0, 16384, -32768])
+        audio = decode_wav_to_float32(build_wav_from_pcm(samples.tobytes(), 16000))
+
+        self.assertEqual(audio.dtype.name, "float32")
+        self.assertEqual(audio.tolist(), [0.0, 0.5, -1.0])
+
+    def test_decode_wav_to_float32_rejects_other_sample_rates_without_resampler(self):
+        samples = array("h", [0, 1200, -1200])
+
+        with patch("audio_utils.load_resample_poly", return_value=None):
+            self.assertIsNone(decode_wav_to_float32(build_wav_from_pcm(samples.tobytes(), 8000)))
+        self.assertIsNone(decode_wav_to_float32(b"not-a-wav"))
+
+    def test_decode_wav_to_float32_resamples_with_reduced_ratio(self):
+        samples = array("h", [0, 1200, -1200, 0])
+        calls = []
+
+        def fake_resample_poly(audio, up, down):
+            calls.append((up, down))
+            return np.repeat(audio, up // down)
+
+        with patch("audio_utils.load_resample_poly", return_value=fake_resample_poly):
+            audio = decode_wav_to_float32(build_wav_from_pcm(samples.tobytes(), 8000))
+
+        self.assertEqual(calls, [(2, 1)])
+        self.assertEqual(audio.dtype.name, "float32")
+        self.assertEqual(len(audio), 8)
+
+    def test_scipy_is_imported_only_when_resampling(self):
+        here = os.path.dirname(os.path.abspath(__file__))
+        with tempfile.TemporaryDirectory() as fake_site:
+            # Stand-in scipy so the check holds whether or not the real one is installed
+            os.makedirs(os.path.join(fake_site, "scipy"))
+            open(os.path.join(fake_site, "scipy", "__init__.py"), "w").close()
+            with open(os.path.join(fake_site, "scipy", "signal.py"), "w") as f:
+                f.write("def resample_poly(audio, up, down):\n    return audio\n")
+            code = (
+                "import sys, audio_utils; before = 'scipy' in sys.modules; "
+                "audio_utils.load_resample_poly(); print(before, 'scipy' in sys.modules)"
+            )
+            env = {**os.environ, "PYTHONPATH": os.pathsep.join([fake_site, here])}
+            result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=here, env=env)
+
+        self.assertEqual(result.stdout.strip(), "False True")
+
+
+class RuntimeEnvTests(unittest.TestCase):
+    def cpu_threads(self, usable: int, logical: int, physical: int | None, requested: int | None = None) -> int:
+        with (
+            patch("runtime_env.usable_cpu_count", return_value=usable),
+            patch("runtime_env.os.cpu_count", return_value=logical),
+            patch("runtime_env.physical_cpu_count", return_value=physical),
+        ):
+            return runtime_env.default_cpu_threads(requested)
+
+    def test_cpu_threads_default_to_one_per_physical_core_on_smt_hosts(self):
+        self.assertEqual(self.cpu_threads(usable=16, logical=16, physical=8), 8)
+        # Affinity mask of 4 logical CPUs on a 2-way SMT host
+        self.assertEqual(self.cpu_threads(usable=4, logical=16, physical=8), 2)
+        self.assertEqual(self.cpu_threads(usable=16, logical=16, physical=8, requested=3), 3)
+
+    def test_cpu_threads_use_every_core_without_smt(self):
+        self.assertEqual(self.cpu_threads(usable=8, logical=8, physical=8), 8)
+        self.assertEqual(self.cpu_threads(usable=1, logical=1, physical=1), 1)
+
+    def test_cpu_threads_fall_back_to_usable_cpus_when_topology_is_unknown(self):
+        self.assertEqual(self.cpu_threads(usable=6, logical=12, physical=None), 6)
+
+    def test_limit_openmp_threads_keeps_user_settings(self):
+        with patch.dict(os.environ, {"OMP_NUM_THREADS": "2"}, clear=False):
+            os.environ.pop("MKL_NUM_THREADS", None)
+            runtime_env.limit_openmp_threads(6)
+            self.assertEqual(os.environ["OMP_NUM_THREADS"], "2")
+            self.assertEqual(os.environ["MKL_NUM_THREADS"], "6")
+
+
+class RuntimeLibraryLookupTests(unittest.TestCase):
+    def test_find_first_library_prefers_pattern_order_then_name(self):
+        with tempfile.TemporaryDirectory() as empty, tempfile.TemporaryDirectory() as libs:
+            for name in ("libcublasLt.so.12", "libcublas.so.12", "libcublas.so.11"):
+                open(os.path.join(libs, name), "w").close()
+            found = asr_engine.find_first_library(
+                [os.path.join(empty, "missing"), empty, libs], ["libcublas.so*", "libcublasLt.so*"]
+            )
+        self.assertEqual(found, os.path.join(libs, "libcublas.so.11"))
+
+
+class WorkerPoolTests(unittest.TestCase):
+    def test_shutdown_cancels_queued_work_and_runs_on_daemon_threads(self):
+        pool = DaemonThreadPool(1, thread_name_prefix="test")
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            return release.wait(5)
+
+        running = pool.submit(block)
+        self.assertTrue(started.wait(5))
+        queued = pool.submit(lambda: "never")
+
+        pool.shutdown(wait=False, cancel_futures=True)
+        release.set()
+
+        self.assertTrue(running.result(timeout=5))
+        self.assertTrue(queued.cancelled())
+        self.assertTrue(all(thread.daemon for thread in pool._threads))
+        with self.assertRaises(RuntimeError):
+            pool.submit(lambda: None)
+
+
+class HttpServerTests(unittest.TestCase):
+    def start_server(self, max_workers: int = 4, keepalive_idle_timeout: float = 5):
+        handler = type("TestHandler", (WhisperHandler,), {"keepalive_idle_timeout": keepalive_idle_timeout})
+        server = ThreadedHTTPServer(("127.0.0.1", 0), handler, max_workers=max_workers)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_address[1]
+
+    def assert_exits_promptly_with_request_in_flight(self, patch_code: str):
+        """Run a server in a subprocess, park one request in a 60s call, shut down, and time the exit."""
+        here = os.path.dirname(os.path.abspath(__file__))
+        code = (
+            "import http.client, threading, time\n"
+            "import asr_engine, whisper_server\n"
+            "entered = threading.Event()\n"
+            "def slow(*_args, **_kwargs):\n"
+            "    entered.set()\n"
+            "    time.sleep(60)\n"
+            f"{patch_code}\n"
+            "server = whisper_server.ThreadedHTTPServer(('127.0.0.1', 0), whisper_server.WhisperHandler, max_workers=2)\n"
+            "threading.Thread(target=server.serve_forever, daemon=True).start()\n"
+            "def client():\n"
+            "    conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=60)\n"
+            "    conn.request('POST', '/transcribe', body=b'RIFF', headers={'Content-Type': 'audio/wav'})\n"
+            "    conn.getresponse()\n"
+            "threading.Thread(target=client, daemon=True).start()\n"
+            "assert entered.wait(10)\n"
+            "server.shutdown()\n"
+            "server.server_close()\n"
+        )
+        start_time = time.monotonic()
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=here, timeout=30)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertLess(time.monotonic() - start_time, 20)
+
+    def test_server_exits_promptly_while_a_handler_is_busy(self):
+        self.assert_exits_promptly_with_request_in_flight("whisper_server.transcribe_audio_payload = slow")
+
+    def test_server_exits_promptly_while_inference_is_running(self):
+        self.assert_exits_promptly_with_request_in_flight(
+            "asr_engine.get_model = lambda **_kwargs: (object(), True, 'cache_hit')\n"
+            "asr_engine.transcribe_audio_bytes = slow"
+        )
+
+    def test_idle_keepalive_connection_releases_its_worker(self):
+        port = self.start_server(max_workers=1, keepalive_idle_timeout=0.2)
+        idle = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        self.addCleanup(idle.close)
+        idle.request("GET", "/health")
+        self.assertEqual(idle.getresponse().status, 200)
+
+        # The only worker is parked on the idle socket until the idle timeout frees it
+        other = http.client.HTTPConnection("127.0.0.1", port, timeout=3)
+        self.addCleanup(other.close)
+        other.request("GET", "/health")
+        self.assertEqual(other.getresponse().status, 200)
+
+    def test_keepalive_connection_serves_consecutive_requests(self):
+        port = self.start_server()
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        self.addCleanup(conn.close)
+        for _ in range(3):
+            conn.request("GET", "/health")
+            response = conn.getresponse()
+            self.assertEqual(json.loads(response.read())["status"], "ok")
+        self.assertFalse(response.will_close)
+
+    def test_stream_rejects_with_503_when_inference_queue_is_full(self):
+        port = self.start_server()
+        with (
+            patch.dict(asr_engine._runtime_policy, {"max_pending_inference": 1}),
+            patch.object(asr_engine, "_inference_pending", 1),
+            patch("asr_engine.get_model", return_value=(object(), True, "cache_hit")),
+            patch("asr_engine.transcribe_audio_bytes") as mock_transcribe_audio_bytes,
+        ):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            self.addCleanup(conn.close)
+            conn.request("POST", "/transcribe/stream", body=b"RIFF-audio", headers={"Content-Type": "audio/wav"})
+            response = conn.getresponse()
+            body = json.loads(response.read())
+
+        self.assertEqual(response.status, 503)
+        self.assertTrue(body["overloaded"])
+        mock_transcribe_audio_bytes.assert_not_called()
+
+    def test_stream_writes_one_ndjson_line_per_segment_then_the_result(self):
+        def fake_transcribe(_audio, params, on_segment=None):
+            self.assertEqual(params["language"], ["en"])
+            on_segment({"text": "hello", "start": 0.0, "end": 1.0})
+            on_segment({"text": "world", "start": 1.0, "end": 2.0})
+            return {"success": True, "text": "hello world"}
+
+        port = self.start_server()
+        with patch("whisper_server.transcribe_audio_payload", side_effect=fake_transcribe):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            self.addCleanup(conn.close)
+            conn.request(
+                "POST", "/transcribe/stream?language=en", body=b"RIFF-audio", headers={"Content-Type": "audio/wav"}
+            )
+            response = conn.getresponse()
+            lines = [json.loads(line) for line in response.read().splitlines()]
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Transfer-Encoding"), "chunked")
+        self.assertEqual(
+            lines,
+            [
+                {"partial": "hello", "start": 0.0, "end": 1.0},
+                {"partial": "world", "start": 1.0, "end": 2.0},
+                {"success": True, "text": "hello world"},
+            ],
+        )
+        self.assertFalse(response.will_close)
+
+    def test_stream_stops_forwarding_when_the_client_stalls(self):
+        class StalledWriter:
+            writes = 0
+
+            def write(self, _data):
+                self.writes += 1
+                raise TimeoutError("timed out")
+
+            def flush(self):
+                pass
+
+        def fake_transcribe(_audio, _params, on_segment=None):
+            on_segment({"text": "hello", "start": 0.0, "end": 1.0})
+            on_segment({"text": "world", "start": 1.0, "end": 2.0})
+            return {"success": True, "text": "hello world"}
+
+        handler = WhisperHandler.__new__(WhisperHandler)
+        handler.headers = {"Content-Length": "4", "Content-Type": "audio/wav"}
+        handler.rfile = io.BufferedReader(io.BytesIO(b"RIFF"))
+        handler.wfile = StalledWriter()
+        handler.path = "/transcribe/stream"
+        handler.request_version = "HTTP/1.1"
+        handler.close_connection = False
+        handler.send_response = handler.send_header = lambda *_args: None
+        handler.end_headers = lambda: None
+        with (
+            patch("whisper_server.transcribe_audio_payload", side_effect=fake_transcribe),
+            patch("threading.excepthook") as mock_excepthook,
+        ):
+            handler.handle_transcribe_stream()
+
+        mock_excepthook.assert_not_called()
+        self.assertTrue(handler.close_connection)
+        # The first failed write ends the stream; nothing else is written to the dead socket
+        self.assertEqual(handler.wfile.writes, 1)
+
+    def test_invalid_content_length_is_reported_as_a_json_error(self):
+        port = self.start_server()
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        self.addCleanup(conn.close)
+        conn.putrequest("POST", "/transcribe")
+        conn.putheader("Content-Type", "audio/wav")
+        conn.putheader("Content-Length", "not-a-number")
+        conn.endheaders()
+        response = conn.getresponse()
+
+        self.assertEqual(response.status, 500)
+        self.assertFalse(json.loads(response.read())["success"])
+
+    def test_read_body_returns_what_arrived_when_the_client_stops_early(self):
+        handler = WhisperHandler.__new__(WhisperHandler)
+        handler.rfile = io.BufferedReader(io.BytesIO(b"RIFF"))
+        self.assertEqual(handler.read_body(10), bytearray(b"RIFF"))
+
+        handler.rfile = io.BufferedReader(io.BytesIO(b"RIFF-audio-and-more"))
+        self.assertEqual(handler.read_body(10), bytearray(b"RIFF-audio"))
+
+
+class WarmupTests(unittest.TestCase):
+    class FakeWhisperModel:
+        def __init__(self, error=None):
+            self.beam_sizes = []
+            self.error = error
+
+        def transcribe(self, audio, beam_size, vad_filter):
+            if self.error:
+                raise self.error
+            self.beam_sizes.append(beam_size)
+            return iter([]), None
+
+    def test_cuda_warmup_primes_greedy_and_beam_search(self):
+        model = self.FakeWhisperModel()
+        asr_engine.warmup_model(model, "faster-whisper", "cuda")
+        self.assertEqual(model.beam_sizes, [1, 5])
+
+    def test_cpu_models_are_not_warmed_up(self):
+        model = self.FakeWhisperModel()
+        asr_engine.warmup_model(model, "faster-whisper", "cpu")
+        self.assertEqual(model.beam_sizes, [])
+
+    def test_warmup_failure_does_not_raise(self):
+        asr_engine.warmup_model(self.FakeWhisperModel(error=RuntimeError("no kernel")), "faster-whisper", "cuda")
+
+
+class WhisperServiceCliTests(unittest.TestCase):
+    class FakeWhisperModel:
+        def __init__(self):
+            self.options = None
+
+        def transcribe(self, audio, **options):
+            self.options = options
+            segment = Namespace(text=" hi ", end=1.0)
+            info = Namespace(language="en", language_probability=0.9, duration=1.0)
+            return iter([segment]), info
+
+    def cli_args(self, **overrides) -> Namespace:
+        args = {
+            "device": "cpu",
+            "beam_size": None,
+            "best_of": None,
+            "vad_min_duration": 3.0,
+            "language": None,
+            "batch_size": None,
+        }
+        args.update(overrides)
+        return Namespace(**args)
+
+    def transcribe(self, audio, **overrides) -> dict:
+        model = self.FakeWhisperModel()
+        with patch("whisper_service.output_progress"):
+            result = whisper_service.transcribe_with_faster_whisper(model, audio, self.cli_args(**overrides))
+        self.assertEqual(result["text"], "hi")
+        return model.options
+
+    def test_short_cpu_clip_runs_greedy_without_vad(self):
+        options = self.transcribe(np.zeros(16000, dtype=np.float32), language="en")
+        self.assertEqual(options, {"beam_size": 1, "best_of": 1, "language": "en"})
+
+    def test_long_cuda_clip_uses_beam_search_and_vad(self):
+        options = self.transcribe(np.zeros(16000 * 5, dtype=np.float32), device="cuda", batch_size=1)
+        self.assertEqual(options["beam_size"], 5)
+        self.assertEqual(options["best_of"], 5)
+        self.assertTrue(options["vad_filter"])
+        self.assertEqual(options["vad_parameters"], {"min_silence_duration_ms": 500})
+
+    def test_explicit_beam_and_best_of_are_honoured(self):
+        options = self.transcribe("clip.mp3", beam_size=3, best_of=2, language="auto")
+        self.assertEqual((options["beam_size"], options["best_of"]), (3, 2))
+        self.assertNotIn("language", options)
+        self.assertTrue(options["vad_filter"])
+
+    def test_resolve_compute_type_defaults_per_device(self):
+        self.assertEqual(whisper_service.resolve_compute_type("cpu", "auto"), "int8")
+        self.assertEqual(whisper_service.resolve_compute_type("cpu", "default"), "int8")
+        self.assertEqual(whisper_service.resolve_compute_type("cuda", None), "auto")
+        self.assertEqual(whisper_service.resolve_compute_type("cuda", "float16"), "float16")
+
+    def test_load_audio_decodes_wav_and_passes_other_files_through(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wav_path = os.path.join(tmp, "clip.wav")
+            with open(wav_path, "wb") as f:
+                f.write(build_wav_from_pcm(array("h", [0, 16384] * 800).tobytes(), 16000))
+            other_path = os.path.join(tmp, "clip.mp3")
+            with open(other_path, "wb") as f:
+                f.write(b"ID3-not-a-wav")
+
+            audio = whisper_service.load_audio(wav_path)
+            self.assertEqual(audio.dtype, np.float32)
+            self.assertEqual(len(audio), 1600)
+            self.assertEqual(whisper_service.load_audio(other_path), other_path)
+
+    def test_first_result_item_unwraps_funasr_shapes(self):
+        self.assertEqual(whisper_service.first_result_item([{"text": "a"}]), {"text": "a"})
+        self.assertEqual(whisper_service.first_result_item([[{"text": "b"}]]), {"text": "b"})
+        self.assertIsNone(whisper_service.first_result_item([]))
+        self.assertIsNone(whisper_service.first_result_item(None))
+
+    def test_dumps_json_keeps_unicode_and_numpy_floats(self):
+        line = whisper_service.dumps_json({"text": "你好", "duration": np.float64(1.5)})
+        self.assertIn("你好", line)
+        self.assertEqual(json.loads(line)["duration"], 1.5)
+
+    def test_detect_gpu_cached_reuses_result_until_key_changes(self):
+        gpu = {"cuda_available": False, "recommended_device": "cpu"}
+        key = {"driver": "1", "ctranslate2": "4.0", "python": sys.executable}
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            patch("whisper_service.tempfile.gettempdir", return_value=tmp),
+            patch("whisper_service.gpu_cache_key", return_value=key) as mock_key,
+            patch("whisper_service.detect_gpu", return_value=gpu) as mock_detect_gpu,
+        ):
+            self.assertEqual(whisper_service.detect_gpu_cached(), gpu)
+            self.assertEqual(whisper_service.detect_gpu_cached(), gpu)
+            self.assertEqual(mock_detect_gpu.call_count, 1)
+
+            mock_key.return_value = {**key, "driver": "2"}
+            whisper_service.detect_gpu_cached()
+            self.assertEqual(mock_detect_gpu.call_count, 2)
+
+    def test_download_progress_is_throttled_by_size_delta(self):
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            patch("whisper_service.PROGRESS_MIN_DELTA_BYTES", 1000),
+            patch("whisper_service.PROGRESS_MAX_INTERVAL_S", 60.0),
+            patch("whisper_service.output_progress") as mock_output_progress,
+        ):
+            blob_path = os.path.join(tmp, "blobs", "model.bin.incomplete")
+            os.makedirs(os.path.dirname(blob_path))
+            with open(blob_path, "wb") as f:
+                f.write(b"x" * 100)
+
+            thread, stop_event = whisper_service.create_progress_hook(tmp)
+            thread.start()
+            try:
+                # The monitor polls every 0.5 s; grow the blob between polls
+                time.sleep(0.25)
+                with open(blob_path, "ab") as f:
+                    f.write(b"x" * 10)
+                time.sleep(0.5)
+                with open(blob_path, "ab") as f:
+                    f.write(b"x" * 2000)
+                time.sleep(0.5)
+            finally:
+                stop_event.set()
+                thread.join()
+
+        self.assertEqual(mock_output_progress.call_count, 2)
+
+
+class JsonEncodingTests(unittest.TestCase):
+    def test_dumps_json_emits_unescaped_utf8(self):
+        body = dumps_json({"text": "你好"})
+        self.assertIn("你好".encode("utf-8"), body)
+        self.assertEqual(loads_json(body), {"text": "你好"})
+
+    def test_dumps_json_falls_back_for_non_string_keys(self):
+        self.assertEqual(loads_json(dumps_json({1: "a"})), {"1": "a"})
+
+
+class MultipartParsingTests(unittest.TestCase):
+    def test_parse_multipart_form_data_keeps_trailing_audio_bytes(self):
+        audio = b"RIFF\x00\x01\r\n--"
+        body = (
+            b"--XyZ\r\n"
+            b'Content-Disposition: form-data; name="language"\r\n\r\n'
+            b"zh\r\n"
+            b"--XyZ\r\n"
+            b'Content-Disposition: form-data; name="audio"; filename="a.wav"\r\n'
+            b"Content-Type: audio/wav\r\n\r\n" + audio + b"\r\n"
+            b"--XyZ--\r\n"
+        )
+
+        audio_data, params = parse_multipart_form_data(body, b"XyZ")
+
+        self.assertEqual(audio_data, audio)
+        self.assertEqual(params, {"language": ["zh"]})
+
+    def test_read_multipart_form_data_handles_delimiters_split_across_chunks(self):
+        audio = bytes(range(256)) * 4
+        body = (
+            b"preamble\r\n--XyZ\r\n"
+            b'Content-Disposition: form-data; name="audio"; filename="a.wav"\r\n\r\n' + audio + b"\r\n"
+            b"--XyZ\r\n"
+            b'Content-Disposition: form-data; name="model"\r\n\r\n'
+            b"base\r\n"
+            b"--XyZ--\r\n"
+        )
+
+        for chunk_size in (1, 7, 64, len(body)):
+            audio_data, params = read_multipart_form_data(io.BytesIO(body), len(body), b"XyZ", chunk_size=chunk_size)
+            self.assertEqual(audio_data, audio)
+            self.assertEqual(params, {"model": ["base"]})
+
+    def test_parse_multipart_boundary_handles_quotes_and_extra_params(self):
+        self.assertEqual(parse_multipart_boundary('multipart/form-data; boundary="a b"; charset=utf-8'), b"a b")
+        self.assertEqual(parse_multipart_boundary("multipart/form-data; boundary=XyZ"), b"XyZ")
+        self.assertIsNone(parse_multipart_boundary("multipart/form-data"))
+
+
 class StreamingSessionPreviewTests(unittest.TestCase):
     def test_emit_preview_sends_accumulated_current_chunk_text(self):
         websocket = DummyWebSocket()
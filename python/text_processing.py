@@ -3,12 +3,17 @@ import re
 import unicodedata
 
 
+_TRUE_STRINGS = frozenset(("1", "true", "yes", "on"))
+
+
 def parse_bool(value, default=False):
     if value is None:
         return default
     if isinstance(value, bool):
         return value
-    return str(value).strip().lower() in ("1", "true", "yes", "on")
+    if not isinstance(value, str):
+        value = str(value)
+    return value.strip().lower() in _TRUE_STRINGS
 
 
 def parse_text_corrections(raw_value) -> list[dict]:
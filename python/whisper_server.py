@@ -8,14 +8,26 @@ JustSay - Local ASR HTTP Server
 """
 
 import argparse
-import base64
+import io
 import json
 import logging
+import queue
 import sys
 import threading
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from urllib.parse import parse_qs, urlparse
 
+try:
+    # SIMD-accelerated drop-in for the stdlib decoder on large JSON uploads
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from websockets.exceptions import InvalidUpgrade
 from websockets.sync.server import serve
 
@@ -25,14 +37,33 @@ from asr_engine import (
     detect_gpu,
     ensure_download_env,
     get_model,
+    list_loaded_models,
     log_runtime_library_diagnostics,
     resolve_sensevoice_device,
     transcribe_audio_payload,
 )
 from text_processing import parse_bool, parse_positive_int
+from worker_pool import DaemonThreadPool
 from ws_streaming import handle_websocket_connection
 
 _ws_server = None
+# Pre-encoded bodies for polled GET endpoints: key -> (version, bytes)
+_cached_json_bodies = {}
+
+
+def dumps_json(data) -> bytes:
+    """Encode a response as UTF-8 JSON, via orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            # e.g. non-str dict keys, which the stdlib encoder coerces to strings
+            pass
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def loads_json(body: bytes):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
 
 
 class _SuppressWsInvalidUpgradeFilter(logging.Filter):
@@ -54,48 +85,213 @@ def configure_ws_logger() -> logging.Logger:
     return logger
 
 
+def parse_multipart_boundary(content_type: str) -> bytes | None:
+    """Return the boundary parameter of a multipart Content-Type header, unquoted."""
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "boundary":
+            return value.strip().strip('"').encode() or None
+    return None
+
+
+def _multipart_field_name(headers: str) -> str | None:
+    """Extract the name="..." value from a part's Content-Disposition header."""
+    start = headers.find('name="')
+    # Skip matches that are really the tail of filename="..."
+    while start >= 4 and headers[start - 4 : start] == "file":
+        start = headers.find('name="', start + 6)
+    if start == -1:
+        return None
+    start += 6
+    end = headers.find('"', start)
+    if end == -1:
+        return None
+    return headers[start:end] or None
+
+
+def parse_multipart_form_data(body: bytes, boundary: bytes) -> tuple[bytearray | None, dict]:
+    """Parse an in-memory multipart/form-data body into (audio bytes, form params)."""
+    return read_multipart_form_data(io.BytesIO(body), len(body), boundary)
+
+
+def read_multipart_form_data(
+    stream, content_length: int, boundary: bytes, chunk_size: int = 64 * 1024
+) -> tuple[bytearray | None, dict]:
+    """Stream-parse a multipart/form-data body from a file-like object.
+
+    Reads fixed-size chunks and appends part contents directly to their sink, so
+    the request body is never materialized alongside the extracted audio.
+    """
+    delimiter = b"--" + boundary
+    next_delimiter = b"\r\n" + delimiter
+    # Bytes held back at a chunk edge in case they start a split delimiter
+    keep = len(next_delimiter) - 1
+    buf = bytearray()
+    remaining = content_length
+    audio_data = None
+    params = {}
+
+    def fill() -> bool:
+        nonlocal remaining
+        if remaining <= 0:
+            return False
+        chunk = stream.read(min(chunk_size, remaining))
+        if not chunk:
+            remaining = 0
+            return False
+        remaining -= len(chunk)
+        buf.extend(chunk)
+        return True
+
+    # Skip the preamble up to the first delimiter
+    while (pos := buf.find(delimiter)) == -1:
+        del buf[: max(0, len(buf) - keep)]
+        if not fill():
+            return None, params
+    del buf[: pos + len(delimiter)]
+
+    while True:
+        while len(buf) < 2 and fill():
+            pass
+        if buf[:2] == b"--":
+            # Consume the epilogue so a keep-alive connection stays in sync
+            while fill():
+                buf.clear()
+            break
+
+        while (header_end := buf.find(b"\r\n\r\n")) == -1:
+            if not fill():
+                return audio_data, params
+        headers = buf[:header_end].decode("utf-8", errors="ignore")
+        del buf[: header_end + 4]
+
+        content = bytearray()
+        while (part_end := buf.find(next_delimiter)) == -1:
+            if len(buf) > keep:
+                content += memoryview(buf)[: len(buf) - keep]
+                del buf[: len(buf) - keep]
+            if not fill():
+                return audio_data, params
+        content += memoryview(buf)[:part_end]
+        del buf[: part_end + len(next_delimiter)]
+
+        name = _multipart_field_name(headers)
+        if "Content-Disposition" in headers and name:
+            if name == "audio" or "filename=" in headers:
+                audio_data = content
+            else:
+                params[name] = [content.decode("utf-8")]
+
+    return audio_data, params
+
+
 class WhisperHandler(BaseHTTPRequestHandler):
     """HTTP request handler."""
 
+    # Keep-alive: the client's many small POSTs reuse one connection instead of
+    # paying a TCP handshake and a pool hand-off each. Every response carries a
+    # Content-Length (or chunked framing), which HTTP/1.1 persistence requires.
+    protocol_version = "HTTP/1.1"
+    # Socket timeout while a request is being read or answered
+    timeout = 30
+    # An idle keep-alive connection holds its pool worker while it waits, so
+    # give the worker back quickly once the client stops sending requests
+    keepalive_idle_timeout = 5
+    _requests_handled = 0
+
+    # Buffer wfile so status line, headers and body leave in a single write;
+    # the base handler flushes it after each request.
+    wbufsize = -1
+    # With whole responses (and each stream line) flushed at once, Nagle only
+    # adds delayed-ACK stalls; StreamRequestHandler.setup() sets TCP_NODELAY.
+    disable_nagle_algorithm = True
+
+    def handle_one_request(self):
+        if self._requests_handled:
+            self.connection.settimeout(self.keepalive_idle_timeout)
+            try:
+                if not self.rfile.peek(1):
+                    self.close_connection = True
+                    return
+            except TimeoutError:
+                self.close_connection = True
+                return
+            self.connection.settimeout(self.timeout)
+        self._requests_handled += 1
+        super().handle_one_request()
+
     def log_message(self, fmt, *args):
         print(f"[HTTP] {args[0]}", flush=True)
 
     def send_json(self, data: dict, status: int = 200):
-        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_json_body(dumps_json(data), status)
+
+    def send_cached_json(self, key: str, version, build_payload):
+        """Send a polled JSON response, re-encoding it only when version changes."""
+        cached = _cached_json_bodies.get(key)
+        if cached is None or cached[0] != version:
+            cached = (version, dumps_json(build_payload()))
+            _cached_json_bodies[key] = cached
+        self.send_json_body(cached[1])
+
+    def send_json_body(self, body: bytes, status: int = 200):
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Content-Length", str(len(body)))
+        if status >= 400:
+            # The request body may be partly unread; don't parse it as the next request
+            self.close_connection = True
+            self.send_header("Connection", "close")
         self.end_headers()
         self.wfile.write(body)
 
+    def read_body(self, content_length: int) -> bytearray:
+        """Read the request body into one preallocated buffer, without an extra copy."""
+        body = bytearray(content_length)
+        view = memoryview(body)
+        received = 0
+        while received < content_length:
+            count = self.rfile.readinto(view[received:])
+            if not count:
+                break
+            received += count
+        if received < content_length:
+            # Client went away mid-body; hand back what arrived
+            del view
+            del body[received:]
+        return body
+
+    def health_payload(self) -> dict:
+        return {
+            "status": "ok",
+            "model_loaded": asr_engine._model is not None,
+            "runtime_policy": {
+                "engine": asr_engine._runtime_policy["engine"],
+                "lock_model": asr_engine._runtime_policy["lock_model"],
+                "lock_device_compute": asr_engine._runtime_policy["lock_device_compute"],
+                "lock_language": asr_engine._runtime_policy["lock_language"],
+                "default_model_type": asr_engine._runtime_policy["default_model_type"],
+                "default_language": asr_engine._runtime_policy["default_language"],
+                "sensevoice_model_id": asr_engine._runtime_policy["sensevoice_model_id"],
+                "sensevoice_use_itn": asr_engine._runtime_policy["sensevoice_use_itn"],
+                "sensevoice_vad_model": asr_engine._runtime_policy["sensevoice_vad_model"],
+                "sensevoice_vad_merge": asr_engine._runtime_policy["sensevoice_vad_merge"],
+                "sensevoice_vad_merge_length_s": asr_engine._runtime_policy["sensevoice_vad_merge_length_s"],
+                "sensevoice_vad_max_single_segment_time_ms": asr_engine._runtime_policy[
+                    "sensevoice_vad_max_single_segment_time_ms"
+                ],
+                "device": asr_engine._runtime_policy["device"],
+                "compute_type": asr_engine._runtime_policy["compute_type"],
+                "sensevoice_compute_type": asr_engine._runtime_policy["sensevoice_compute_type"],
+            },
+        }
+
     def do_GET(self):
         parsed = urlparse(self.path)
 
         if parsed.path == "/health":
-            self.send_json(
-                {
-                    "status": "ok",
-                    "model_loaded": asr_engine._model is not None,
-                    "runtime_policy": {
-                        "engine": asr_engine._runtime_policy["engine"],
-                        "lock_model": asr_engine._runtime_policy["lock_model"],
-                        "lock_device_compute": asr_engine._runtime_policy["lock_device_compute"],
-                        "lock_language": asr_engine._runtime_policy["lock_language"],
-                        "default_model_type": asr_engine._runtime_policy["default_model_type"],
-                        "default_language": asr_engine._runtime_policy["default_language"],
-                        "sensevoice_model_id": asr_engine._runtime_policy["sensevoice_model_id"],
-                        "sensevoice_use_itn": asr_engine._runtime_policy["sensevoice_use_itn"],
-                        "sensevoice_vad_model": asr_engine._runtime_policy["sensevoice_vad_model"],
-                        "sensevoice_vad_merge": asr_engine._runtime_policy["sensevoice_vad_merge"],
-                        "sensevoice_vad_merge_length_s": asr_engine._runtime_policy["sensevoice_vad_merge_length_s"],
-                        "sensevoice_vad_max_single_segment_time_ms": asr_engine._runtime_policy[
-                            "sensevoice_vad_max_single_segment_time_ms"
-                        ],
-                        "device": asr_engine._runtime_policy["device"],
-                        "compute_type": asr_engine._runtime_policy["compute_type"],
-                    },
-                }
-            )
+            # Clients poll this; the body only changes when a model is (un)loaded
+            self.send_cached_json("/health", asr_engine._model_state_version, self.health_payload)
         elif parsed.path == "/capabilities":
             self.send_json(
                 {
@@ -105,6 +301,7 @@ class WhisperHandler(BaseHTTPRequestHandler):
                     "audio_format": "pcm_s16le",
                     "sample_rate": 16000,
                     "ws_path": "/stream",
+                    "http_stream_path": "/transcribe/stream",
                     "ws_port": asr_engine._runtime_policy["ws_port"],
                     "interim_schema": {
                         "previewText": "Current sliding-window preview guess; may be rewritten between revisions",
@@ -125,6 +322,9 @@ class WhisperHandler(BaseHTTPRequestHandler):
                     "query_options": {
                         "return_word_timestamps": "Set to true to request optional per-word timings when supported",
                         "text_corrections": "Optional JSON object with user-configurable text correction entries",
+                        "beam_size": "Optional faster-whisper beam width; defaults to 1 for tiny/base and 5 otherwise",
+                        "best_of": "Optional faster-whisper candidates sampled on temperature fallback; defaults to beam_size",
+                        "vad": "Optional faster-whisper VAD filter: on, off or auto (default; skipped for clips under 3s)",
                         "sensevoice_vad_model": "Optional FunASR VAD model id for SenseVoice, for example fsmn-vad",
                         "sensevoice_vad_merge": "Set to true to merge VAD segments in SenseVoice output",
                         "sensevoice_vad_merge_length_s": "Optional SenseVoice VAD merge length in seconds",
@@ -133,9 +333,17 @@ class WhisperHandler(BaseHTTPRequestHandler):
                 }
             )
         elif parsed.path == "/gpu":
-            self.send_json(detect_gpu())
+            # detect_gpu is cached for the process, so this body never changes
+            self.send_cached_json("/gpu", None, detect_gpu)
         elif parsed.path == "/model/info":
             self.send_json({"loaded": asr_engine._model is not None, **asr_engine._model_info})
+        elif parsed.path == "/model/list":
+            self.send_json(
+                {
+                    "models": list_loaded_models(),
+                    "max_loaded_models": asr_engine._runtime_policy["max_loaded_models"],
+                }
+            )
         else:
             self.send_json({"error": "Not found"}, 404)
 
@@ -143,6 +351,8 @@ class WhisperHandler(BaseHTTPRequestHandler):
         parsed = urlparse(self.path)
         if parsed.path == "/transcribe":
             self.handle_transcribe()
+        elif parsed.path == "/transcribe/stream":
+            self.handle_transcribe_stream()
         elif parsed.path == "/model/load":
             self.handle_load_model()
         elif parsed.path == "/model/unload":
@@ -158,30 +368,113 @@ class WhisperHandler(BaseHTTPRequestHandler):
             if "multipart/form-data" in content_type:
                 result = self.handle_multipart_transcribe(content_length)
             elif "application/json" in content_type:
-                body = self.rfile.read(content_length)
-                data = json.loads(body.decode("utf-8"))
+                # Parse the bytes directly; nothing else holds on to the raw body
+                data = loads_json(self.read_body(content_length))
                 result = self.transcribe_from_json(data)
             elif "audio/" in content_type or "application/octet-stream" in content_type:
-                audio_data = self.rfile.read(content_length)
+                audio_data = self.read_body(content_length)
                 params = parse_qs(urlparse(self.path).query)
                 result = self.transcribe_audio(audio_data, params)
             else:
                 self.send_json({"error": f"Unsupported content type: {content_type}"}, 400)
                 return
 
-            self.send_json(result)
+            self.send_json(result, 503 if result.get("overloaded") else 200)
         except Exception as exc:
             self.send_json({"success": False, "error": str(exc), "text": ""}, 500)
 
+    def handle_transcribe_stream(self):
+        """Stream NDJSON: one {"partial", "start", "end"} line per segment, then the final result."""
+        content_length = int(self.headers.get("Content-Length", 0))
+        content_type = self.headers.get("Content-Type", "")
+        if "audio/" not in content_type and "application/octet-stream" not in content_type:
+            self.send_json({"error": f"Unsupported content type: {content_type}"}, 400)
+            return
+
+        audio_data = self.read_body(content_length)
+        params = parse_qs(urlparse(self.path).query)
+        events = queue.Queue()
+        chunked = self.request_version == "HTTP/1.1"
+        stream_started = False
+        stream_failed = False
+
+        def start_stream():
+            nonlocal stream_started
+            stream_started = True
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+            if chunked:
+                # Chunked framing delimits the body, so the connection can be kept alive
+                self.send_header("Transfer-Encoding", "chunked")
+            else:
+                # HTTP/1.0: the end of the body is signalled by closing the connection
+                self.send_header("Connection", "close")
+                self.close_connection = True
+            self.end_headers()
+
+        def write_line(payload: dict):
+            line = dumps_json(payload) + b"\n"
+            if chunked:
+                line = b"%x\r\n%s\r\n" % (len(line), line)
+            self.wfile.write(line)
+            self.wfile.flush()
+
+        def forward_segments():
+            nonlocal stream_failed
+            try:
+                segment = events.get()
+                if segment is not None:
+                    start_stream()
+                while segment is not None:
+                    write_line({"partial": segment["text"], "start": segment["start"], "end": segment["end"]})
+                    segment = events.get()
+            except OSError:
+                # Client went away or stalled past the socket timeout: stop forwarding;
+                # the remaining segments just collect in the queue until inference ends
+                stream_failed = True
+                self.close_connection = True
+
+        # Transcribe on this thread through the shared inference pool, like /transcribe;
+        # the forwarder only writes to the socket, so a slow client never stalls a worker
+        forwarder = threading.Thread(target=forward_segments, daemon=True)
+        forwarder.start()
+        try:
+            result = transcribe_audio_payload(audio_data, params, on_segment=events.put)
+        except Exception as exc:
+            result = {"success": False, "error": str(exc), "text": ""}
+        events.put(None)
+        forwarder.join()
+
+        if not stream_started and result.get("overloaded"):
+            # Rejected before any segment was produced, so a plain 503 is still possible
+            self.send_json(result, 503)
+            return
+
+        if stream_failed:
+            return
+        try:
+            if not stream_started:
+                start_stream()
+            write_line(result)
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            self.close_connection = True
+
     def transcribe_audio(self, audio_data: bytes, params: dict) -> dict:
-        return transcribe_audio_payload(audio_data, params)
+        return transcribe_audio_payload(audio_data, params, use_cache=True)
 
     def transcribe_from_json(self, data: dict) -> dict:
-        audio_b64 = data.get("audio")
+        # Pop the base64 text so it can be freed as soon as it is decoded
+        audio_b64 = data.pop("audio", None)
         if not audio_b64:
             return {"success": False, "error": "Missing audio field", "text": ""}
 
+        if audio_b64.startswith("data:"):
+            # Accept data URLs (data:audio/wav;base64,...) as well as bare base64
+            audio_b64 = audio_b64.partition(",")[2]
         audio_data = base64.b64decode(audio_b64)
+        del audio_b64
         params = {
             "engine": [data.get("engine", asr_engine._runtime_policy["engine"])],
             "model": [data.get("model", asr_engine._runtime_policy["default_model_type"])],
@@ -199,8 +492,13 @@ class WhisperHandler(BaseHTTPRequestHandler):
                 )
             ],
             "device": [data.get("device", asr_engine._runtime_policy["device"])],
-            "compute_type": [data.get("compute_type", asr_engine._runtime_policy["compute_type"])],
+            # Unset falls back to the loaded model's compute type, so it isn't reloaded
+            "compute_type": [data.get("compute_type")],
+            "sensevoice_compute_type": [data.get("sensevoice_compute_type")],
             "language": [data.get("language")],
+            "beam_size": [data.get("beam_size")],
+            "best_of": [data.get("best_of")],
+            "vad": [data.get("vad")],
             "download_root": [data.get("download_root")],
             "offline_segmented": [data.get("offline_segmented", False)],
             "offline_segment_silence_ms": [data.get("offline_segment_silence_ms", 1200)],
@@ -213,37 +511,13 @@ class WhisperHandler(BaseHTTPRequestHandler):
         return self.transcribe_audio(audio_data, params)
 
     def handle_multipart_transcribe(self, content_length: int) -> dict:
-        import re
-
-        body = self.rfile.read(content_length)
-        content_type = self.headers.get("Content-Type", "")
-        boundary = content_type.split("boundary=")[-1].encode()
-
-        parts = body.split(b"--" + boundary)
-        audio_data = None
-        params = {}
-
-        for part in parts:
-            if b"Content-Disposition" not in part:
-                continue
-
-            header_end = part.find(b"\r\n\r\n")
-            if header_end == -1:
-                continue
-
-            headers = part[:header_end].decode("utf-8", errors="ignore")
-            content = part[header_end + 4 :].rstrip(b"\r\n--")
-
-            name_match = re.search(r'name="([^"]+)"', headers)
-            if not name_match:
-                continue
-
-            name = name_match.group(1)
-            if name == "audio" or "filename=" in headers:
-                audio_data = content
-            else:
-                params[name] = [content.decode("utf-8")]
+        boundary = parse_multipart_boundary(self.headers.get("Content-Type", ""))
+        if not boundary:
+            # The body was never read, so the connection can't be reused
+            self.close_connection = True
+            return {"success": False, "error": "Missing multipart boundary", "text": ""}
 
+        audio_data, params = read_multipart_form_data(self.rfile, content_length, boundary)
         if not audio_data:
             return {"success": False, "error": "No audio file in request", "text": ""}
 
@@ -253,7 +527,7 @@ class WhisperHandler(BaseHTTPRequestHandler):
         try:
             content_length = int(self.headers.get("Content-Length", 0))
             body = self.rfile.read(content_length)
-            data = json.loads(body.decode("utf-8")) if body else {}
+            data = loads_json(body) if body else {}
 
             engine = data.get("engine", asr_engine._runtime_policy["engine"])
             model_type = data.get("model", asr_engine._runtime_policy["default_model_type"])
@@ -288,6 +562,9 @@ class WhisperHandler(BaseHTTPRequestHandler):
                 resolved_sensevoice_device = resolve_sensevoice_device(device)
                 device = "cuda" if resolved_sensevoice_device.startswith("cuda") else "cpu"
                 model_type = None
+                compute_type = data.get(
+                    "sensevoice_compute_type", asr_engine._runtime_policy["sensevoice_compute_type"]
+                )
 
             _, model_reused, reload_reason = get_model(
                 engine=engine,
@@ -322,6 +599,9 @@ class WhisperHandler(BaseHTTPRequestHandler):
     def handle_unload_model(self):
         with asr_engine._model_lock:
             asr_engine._model = None
+            asr_engine._active_model = None
+            asr_engine._loaded_models.clear()
+            asr_engine._model_state_version += 1
             asr_engine._model_info.update(
                 {
                     "engine": None,
@@ -339,12 +619,31 @@ class WhisperHandler(BaseHTTPRequestHandler):
 
 
 class ThreadedHTTPServer(HTTPServer):
-    """HTTP server that handles each request in a new thread."""
+    """HTTP server that handles requests on a bounded worker pool."""
+
+    request_queue_size = 128
+    # Each worker serves one connection for its lifetime, so the pool must cover
+    # every request the inference pool admits plus keep-alive connections idling
+    # between requests (up to WhisperHandler.keepalive_idle_timeout each).
+    idle_connection_allowance = 48
+
+    @classmethod
+    def default_max_workers(cls) -> int:
+        return max(1, asr_engine._runtime_policy["max_pending_inference"]) + cls.idle_connection_allowance
+
+    def __init__(self, server_address, RequestHandlerClass, max_workers: int | None = None):
+        super().__init__(server_address, RequestHandlerClass)
+        # Daemon workers, as with the old thread-per-request server, so an in-flight
+        # or idle keep-alive handler never holds up shutdown
+        self._executor = DaemonThreadPool(
+            max(1, max_workers or self.default_max_workers()), thread_name_prefix="http"
+        )
 
     def process_request(self, request, client_address):
-        thread = threading.Thread(target=self.process_request_thread, args=(request, client_address))
-        thread.daemon = True
-        thread.start()
+        # Excess connections wait in the pool queue instead of spawning threads
+        future = self._executor.submit(self.process_request_thread, request, client_address)
+        # A connection cancelled at shutdown never reaches process_request_thread; close it here
+        future.add_done_callback(lambda f: self.shutdown_request(request) if f.cancelled() else None)
 
     def process_request_thread(self, request, client_address):
         try:
@@ -354,6 +653,11 @@ class ThreadedHTTPServer(HTTPServer):
         finally:
             self.shutdown_request(request)
 
+    def server_close(self):
+        super().server_close()
+        # Queued connections are closed unserved; running handlers finish on their own
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
 
 def start_ws_server(host: str, ws_port: int):
     global _ws_server
@@ -396,6 +700,14 @@ def main():
     parser.add_argument("--host", default="127.0.0.1", help="Host to bind to")
     parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
     parser.add_argument("--ws-port", type=int, default=8766, help="WebSocket streaming port")
+    parser.add_argument(
+        "--http-workers",
+        type=int,
+        help=(
+            "HTTP handler threads (default: --max-pending-requests + "
+            f"{ThreadedHTTPServer.idle_connection_allowance} for idle keep-alive connections)"
+        ),
+    )
     parser.add_argument("--engine", default="faster-whisper", choices=["faster-whisper", "sensevoice"])
     parser.add_argument("--preload-model", help="Pre-load faster-whisper model on startup")
     parser.add_argument(
@@ -448,13 +760,51 @@ def main():
         help="Ignore request language and always use server default language",
     )
     parser.add_argument("--device", default="cpu", choices=["cpu", "cuda"])
-    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument(
+        "--compute-type",
+        default="auto",
+        help='CTranslate2 compute type; "auto" picks int8 on CPU and the fastest supported type on CUDA',
+    )
+    parser.add_argument(
+        "--sensevoice-compute-type",
+        default="float32",
+        choices=["float32", "float16", "int8"],
+        help="SenseVoice precision: float16 autocast on CUDA, int8 dynamic quantization on CPU",
+    )
     parser.add_argument(
         "--lock-device-compute",
         action="store_true",
         help="Ignore request device/compute_type and always use startup values",
     )
     parser.add_argument("--download-root", help="Model cache directory")
+    parser.add_argument(
+        "--max-loaded-models",
+        type=int,
+        default=2,
+        help="How many model variants to keep resident before evicting the least recently used",
+    )
+    parser.add_argument(
+        "--inference-workers",
+        type=int,
+        help="Concurrent transcriptions (default: 1 on CUDA/SenseVoice, cpu threads/4 for faster-whisper on CPU)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        help="faster-whisper VAD chunks decoded together for clips over 30s (1 disables batching)",
+    )
+    parser.add_argument(
+        "--cpu-threads",
+        type=int,
+        help="Total CTranslate2 CPU threads, split across inference workers (default: one per physical core)",
+    )
+    parser.add_argument(
+        "--max-pending-requests",
+        type=int,
+        default=16,
+        help="Transcriptions allowed to queue or run before new ones get 503",
+    )
 
     args = parser.parse_args()
 
@@ -474,7 +824,13 @@ def main():
     )
     asr_engine._runtime_policy["device"] = args.device
     asr_engine._runtime_policy["compute_type"] = args.compute_type
+    asr_engine._runtime_policy["sensevoice_compute_type"] = args.sensevoice_compute_type
     asr_engine._runtime_policy["download_root"] = args.download_root
+    asr_engine._runtime_policy["max_loaded_models"] = max(1, args.max_loaded_models)
+    asr_engine._runtime_policy["inference_workers"] = args.inference_workers
+    asr_engine._runtime_policy["cpu_threads"] = args.cpu_threads
+    asr_engine._runtime_policy["batch_size"] = max(1, args.batch_size)
+    asr_engine._runtime_policy["max_pending_inference"] = max(1, args.max_pending_requests)
     asr_engine._runtime_policy["ws_port"] = args.ws_port
 
     ensure_download_env(args.download_root)
@@ -489,10 +845,12 @@ def main():
         try:
             preload_device = args.device
             preload_model_type = args.preload_model or args.default_model
+            preload_compute_type = args.compute_type
             if args.engine == "sensevoice":
                 resolved_sensevoice_device = resolve_sensevoice_device(args.device)
                 preload_device = "cuda" if resolved_sensevoice_device.startswith("cuda") else "cpu"
                 preload_model_type = None
+                preload_compute_type = args.sensevoice_compute_type
             get_model(
                 engine=args.engine,
                 model_type=preload_model_type,
@@ -502,7 +860,7 @@ def main():
                     args.sensevoice_vad_max_single_segment_time_ms
                 ),
                 device=preload_device,
-                compute_type=args.compute_type,
+                compute_type=preload_compute_type,
                 download_root=args.download_root,
             )
         except Exception as exc:
@@ -511,7 +869,7 @@ def main():
     if args.ws_port == args.port:
         raise ValueError("--ws-port must be different from --port")
 
-    server = ThreadedHTTPServer((args.host, args.port), WhisperHandler)
+    server = ThreadedHTTPServer((args.host, args.port), WhisperHandler, max_workers=args.http_workers)
     start_ws_server(args.host, args.ws_port)
     print(f"[Server] Local ASR HTTP server running on http://{args.host}:{args.port}", flush=True)
     print("[Server] Endpoints:", flush=True)
@@ -521,6 +879,7 @@ def main():
     print("  GET  /model/info   - Current model info", flush=True)
     print(f"  WS   /stream       - WebSocket streaming ASR (port: {args.ws_port})", flush=True)
     print("  POST /transcribe   - Transcribe audio", flush=True)
+    print("  POST /transcribe/stream - Transcribe audio, streaming NDJSON segments", flush=True)
     print("  POST /model/load   - Pre-load model", flush=True)
     print("  POST /model/unload - Unload model", flush=True)
 
@@ -537,6 +896,7 @@ def main():
     except KeyboardInterrupt:
         print("\n[Server] Shutting down...", flush=True)
         server.shutdown()
+        server.server_close()
         stop_ws_server()
 
 
@@ -10,43 +10,36 @@ import argparse
 import json
 import os
 import sys
+import tempfile
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-DEFAULT_SENSEVOICE_MODEL_ID = "FunAudioLLM/SenseVoiceSmall"
-FASTER_WHISPER_MODELS = {"tiny", "base", "small", "medium", "large-v3"}
-
-
-def add_nvidia_paths():
-    """Add NVIDIA library paths to DLL search path for Windows."""
-    if os.name != "nt":
-        return
-
-    import site
-
-    possible_paths = site.getsitepackages() if hasattr(site, "getsitepackages") else []
+from runtime_env import add_nvidia_paths, default_cpu_threads, limit_openmp_threads
 
-    for path in sys.path:
-        if "site-packages" in path and os.path.isdir(path) and path not in possible_paths:
-            possible_paths.append(path)
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-    for site_packages in possible_paths:
-        nvidia_path = os.path.join(site_packages, "nvidia")
-        if not os.path.isdir(nvidia_path):
-            continue
-
-        for item in os.listdir(nvidia_path):
-            bin_path = os.path.join(nvidia_path, item, "bin")
-            if os.path.isdir(bin_path):
-                try:
-                    os.add_dll_directory(bin_path)
-                except Exception:
-                    pass
-                os.environ["PATH"] = bin_path + os.pathsep + os.environ.get("PATH", "")
-        return
+DEFAULT_SENSEVOICE_MODEL_ID = "FunAudioLLM/SenseVoiceSmall"
+FASTER_WHISPER_MODELS = {"tiny", "base", "small", "medium", "large-v3"}
+BATCHED_MIN_DURATION_S = 30.0
+PROGRESS_MIN_DELTA_BYTES = 4 * 1024 * 1024
+PROGRESS_MAX_INTERVAL_S = 2.0
+GPU_CACHE_FILENAME = "just-say-gpu.json"
+GPU_CACHE_TTL_S = 24 * 60 * 60
 
 
-add_nvidia_paths()
+def dumps_json(data) -> str:
+    """Serialize a stdout/stderr message, via orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data).decode("utf-8")
+        except TypeError:
+            # e.g. numpy.float64 from an engine, which stdlib json encodes as a float
+            pass
+    return json.dumps(data, ensure_ascii=False)
 
 
 def parse_bool(value, default=False):
@@ -60,7 +53,7 @@ def parse_bool(value, default=False):
 def output_progress(percent: float, status: str = "downloading"):
     """Output progress update as JSON to stderr (stdout reserved for final result)."""
     print(
-        json.dumps({"type": "progress", "percent": round(percent, 1), "status": status}, ensure_ascii=False),
+        dumps_json({"type": "progress", "percent": round(percent, 1), "status": status}),
         file=sys.stderr,
         flush=True,
     )
@@ -76,25 +69,32 @@ def create_progress_hook(download_root: str):
 
         blobs_dir = os.path.join(download_root, "blobs")
         incomplete_suffix = ".incomplete"
-        last_size = 0
+        last_emit_size = 0
+        last_emit_time = 0.0
 
         while not stop_event.is_set():
             try:
                 if os.path.exists(blobs_dir):
                     total_size = 0
                     incomplete_count = 0
-                    for filename in os.listdir(blobs_dir):
-                        file_path = os.path.join(blobs_dir, filename)
-                        if os.path.isfile(file_path):
-                            size = os.path.getsize(file_path)
-                            total_size += size
-                            if filename.endswith(incomplete_suffix):
-                                incomplete_count += 1
-
-                    if total_size != last_size:
+                    # scandir hands back type info with each entry, leaving one stat per file
+                    with os.scandir(blobs_dir) as entries:
+                        for entry in entries:
+                            if entry.is_file():
+                                total_size += entry.stat().st_size
+                                if entry.name.endswith(incomplete_suffix):
+                                    incomplete_count += 1
+
+                    # Throttle to every 4 MB or 2 s so slow trickles don't flood the parent with lines
+                    now = time.monotonic()
+                    if total_size != last_emit_size and (
+                        total_size - last_emit_size >= PROGRESS_MIN_DELTA_BYTES
+                        or now - last_emit_time >= PROGRESS_MAX_INTERVAL_S
+                    ):
                         mb = total_size / (1024 * 1024)
                         output_progress(mb, f"downloading ({mb:.1f} MB)")
-                        last_size = total_size
+                        last_emit_size = total_size
+                        last_emit_time = now
 
                     if incomplete_count == 0 and total_size > 0:
                         break
@@ -117,6 +117,7 @@ def detect_gpu():
     }
 
     try:
+        add_nvidia_paths()
         import ctranslate2
 
         cuda_device_count = ctranslate2.get_cuda_device_count()
@@ -131,8 +132,59 @@ def detect_gpu():
     return result
 
 
+def gpu_cache_key() -> dict:
+    """What a cached detect_gpu result depends on: the driver, ctranslate2 and the interpreter."""
+    driver = None
+    try:
+        if os.name == "nt":
+            system_root = os.environ.get("SystemRoot", r"C:\Windows")
+            st = os.stat(os.path.join(system_root, "System32", "nvcuda.dll"))
+            driver = f"{st.st_size}:{st.st_mtime_ns}"
+        else:
+            with open("/proc/driver/nvidia/version", encoding="utf-8") as f:
+                driver = f.read().strip()
+    except OSError:
+        pass
+
+    ct2_version = None
+    try:
+        from importlib.metadata import version
+
+        ct2_version = version("ctranslate2")
+    except Exception:
+        pass
+
+    return {"driver": driver, "ctranslate2": ct2_version, "python": sys.executable}
+
+
+def detect_gpu_cached():
+    """detect_gpu, reusing a result from the last day while the driver and ctranslate2 are unchanged.
+
+    Importing ctranslate2 resolves the CUDA DLLs, which dominates a --detect-gpu run.
+    """
+    cache_path = os.path.join(tempfile.gettempdir(), GPU_CACHE_FILENAME)
+    key = gpu_cache_key()
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["key"] == key and 0 <= time.time() - cached["time"] < GPU_CACHE_TTL_S:
+            return cached["result"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    result = detect_gpu()
+    try:
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "time": time.time(), "result": result}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return result
+
+
 def output_error(msg):
-    print(json.dumps({"success": False, "error": msg, "text": ""}, ensure_ascii=False))
+    print(dumps_json({"success": False, "error": msg, "text": ""}))
 
 
 def ensure_download_env(download_root: str | None):
@@ -143,15 +195,30 @@ def ensure_download_env(download_root: str | None):
     os.environ["MODELSCOPE_CACHE"] = download_root
 
 
+def resolve_compute_type(device: str, compute_type: str | None) -> str:
+    """Resolve an unset compute type: CTranslate2 "auto" on CUDA, INT8 GEMMs on CPU."""
+    if compute_type and compute_type not in ("default", "auto"):
+        return compute_type
+    # "default" keeps the checkpoint's float16 weights, which CPUs then run as float32
+    return "auto" if device == "cuda" else "int8"
+
+
 def load_faster_whisper_model(args):
+    cpu_threads = default_cpu_threads(args.cpu_threads) if args.device == "cpu" else 0
+    if cpu_threads:
+        limit_openmp_threads(cpu_threads)
+
     from faster_whisper import WhisperModel
 
     model_id = args.model_path if args.model_path and os.path.exists(args.model_path) else args.model
     return WhisperModel(
         model_id,
         device=args.device,
-        compute_type=args.compute_type,
+        compute_type=resolve_compute_type(args.device, args.compute_type),
         download_root=args.download_root,
+        # One file per process: a single worker gets every thread
+        num_workers=1,
+        cpu_threads=cpu_threads,
     )
 
 
@@ -190,13 +257,55 @@ def resolve_sensevoice_device(device: str) -> str:
         return "cpu"
 
 
-def transcribe_with_faster_whisper(model, args):
-    options = {"beam_size": 5, "vad_filter": True, "vad_parameters": {"min_silence_duration_ms": 500}}
+def load_audio(path: str):
+    """Decode a PCM16 WAV once into a 16 kHz float32 array; other formats stay a path."""
+    from audio_utils import decode_wav_to_float32
+
+    with open(path, "rb") as f:
+        audio = decode_wav_to_float32(f.read())
+    # Both engines decode anything else (or off-rate WAV without scipy) themselves
+    return audio if audio is not None else path
+
+
+def transcribe_with_faster_whisper(model, audio, args):
+    # Greedy on CPU, where beam search multiplies decode cost for little gain on dictation
+    beam_size = args.beam_size or (1 if args.device == "cpu" else 5)
+    # Keep temperature-fallback sampling from fanning out wider than the beam
+    options = {"beam_size": beam_size, "best_of": args.best_of or beam_size}
+    # Silero VAD is a fixed cost that can exceed the decode itself on short dictation clips
+    if isinstance(audio, str) or len(audio) / 16000 >= args.vad_min_duration:
+        options["vad_filter"] = True
+        options["vad_parameters"] = {"min_silence_duration_ms": 500}
     if args.language and args.language != "auto":
         options["language"] = args.language
 
-    segments, info = model.transcribe(args.audio, **options)
-    text = " ".join(seg.text.strip() for seg in segments).strip()
+    batch_size = args.batch_size if args.batch_size is not None else (8 if args.device == "cuda" else 1)
+    segments, info = None, None
+    # Short clips are a single VAD chunk or two; batching only pays off on long-form audio
+    if (
+        batch_size > 1
+        and options.get("vad_filter")
+        and not isinstance(audio, str)
+        and len(audio) / 16000 > BATCHED_MIN_DURATION_S
+    ):
+        try:
+            from faster_whisper import BatchedInferencePipeline
+
+            pipeline = BatchedInferencePipeline(model=model)
+            segments, info = pipeline.transcribe(audio, batch_size=batch_size, **options)
+        except (ImportError, TypeError) as exc:
+            print(f"[Service] Batched transcription unavailable, using sequential: {exc}", file=sys.stderr, flush=True)
+    if segments is None:
+        segments, info = model.transcribe(audio, **options)
+    # Segments decode lazily; report progress on stderr as each one lands
+    segment_texts = []
+    for seg in segments:
+        segment_text = seg.text.strip()
+        if segment_text:
+            segment_texts.append(segment_text)
+        if info.duration > 0:
+            output_progress(min(seg.end / info.duration, 1.0) * 100, "transcribing")
+    text = " ".join(segment_texts)
 
     return {
         "success": True,
@@ -207,35 +316,39 @@ def transcribe_with_faster_whisper(model, args):
     }
 
 
-def transcribe_with_sensevoice(model, args):
+def first_result_item(result):
+    """Unwrap funasr's [item] / [[item]] result shapes; None when there is nothing to read."""
+    if not isinstance(result, list):
+        return None
+    try:
+        item = result[0]
+        return item[0] if isinstance(item, list) else item
+    except IndexError:
+        return None
+
+
+def transcribe_with_sensevoice(model, audio, args):
     from funasr.utils.postprocess_utils import rich_transcription_postprocess
 
     language = args.language if args.language and args.language != "auto" else "auto"
     result = model.generate(
-        input=args.audio,
+        input=audio,
         cache={},
         language=language,
         use_itn=parse_bool(args.sensevoice_use_itn, True),
         batch_size_s=60,
     )
 
-    item = None
-    if isinstance(result, list) and result:
-        item = result[0]
-        if isinstance(item, list) and item:
-            item = item[0]
-
+    item = first_result_item(result)
     text_raw = ""
+    detected_language = None
     if isinstance(item, dict):
         text_raw = item.get("text", "") or ""
+        detected_language = item.get("language") or item.get("lang")
     elif item is not None:
         text_raw = str(item)
 
     text = rich_transcription_postprocess(text_raw) if text_raw else ""
-    detected_language = None
-    if isinstance(item, dict):
-        detected_language = item.get("language") or item.get("lang")
-
     return {"success": True, "text": text, "language": detected_language or language}
 
 
@@ -257,7 +370,29 @@ def main():
     parser.add_argument("--sensevoice-model-id", default=DEFAULT_SENSEVOICE_MODEL_ID)
     parser.add_argument("--sensevoice-use-itn", default="true")
     parser.add_argument("--device", default="cpu", choices=["cpu", "cuda"])
-    parser.add_argument("--compute-type", default="default")
+    parser.add_argument(
+        "--compute-type",
+        default="auto",
+        help='CTranslate2 compute type; "auto"/"default" picks auto on CUDA and int8 on CPU',
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Faster-Whisper batch size for long audio (default: 8 on CUDA, 1 on CPU)",
+    )
+    parser.add_argument(
+        "--cpu-threads",
+        type=int,
+        help="CTranslate2 threads on CPU (default: one per physical core)",
+    )
+    parser.add_argument("--beam-size", type=int, help="Faster-Whisper beam size (default: 1 on CPU, 5 on CUDA)")
+    parser.add_argument("--best-of", type=int, help="Faster-Whisper sampling candidates (default: beam size)")
+    parser.add_argument(
+        "--vad-min-duration",
+        type=float,
+        default=3.0,
+        help="Skip Faster-Whisper VAD for clips shorter than this many seconds",
+    )
     parser.add_argument("--language", help="Language code")
     parser.add_argument("--download-only", action="store_true", help="Download model and exit")
     parser.add_argument("--download-root", help="Cache directory for models")
@@ -265,9 +400,12 @@ def main():
 
     args = parser.parse_args()
     ensure_download_env(args.download_root)
+    # Only CUDA runs need the NVIDIA DLLs (detect_gpu adds them itself); CPU runs skip the walk
+    if args.device == "cuda":
+        add_nvidia_paths()
 
     if args.detect_gpu:
-        print(json.dumps(detect_gpu(), ensure_ascii=False))
+        print(dumps_json(detect_gpu_cached()))
         return 0
 
     if not args.download_only:
@@ -282,6 +420,13 @@ def main():
         validate_model_args(args)
         start_time = time.time()
 
+        audio_future = None
+        if not args.download_only:
+            # Decode the input while the model loads; the two are independent
+            decode_executor = ThreadPoolExecutor(max_workers=1)
+            audio_future = decode_executor.submit(load_audio, args.audio)
+            decode_executor.shutdown(wait=False)
+
         progress_thread = None
         stop_event = None
         if args.download_only:
@@ -305,16 +450,17 @@ def main():
 
         if args.download_only:
             output_progress(100, "complete")
-            print(json.dumps({"success": True, "text": "Model downloaded", "duration": 0}, ensure_ascii=False))
+            print(dumps_json({"success": True, "text": "Model downloaded", "duration": 0}))
             return 0
 
+        audio = audio_future.result()
         if args.engine == "faster-whisper":
-            payload = transcribe_with_faster_whisper(model, args)
+            payload = transcribe_with_faster_whisper(model, audio, args)
         else:
-            payload = transcribe_with_sensevoice(model, args)
+            payload = transcribe_with_sensevoice(model, audio, args)
 
         payload["processing_time"] = time.time() - start_time
-        print(json.dumps(payload, ensure_ascii=False))
+        print(dumps_json(payload))
         return 0
 
     except ImportError as exc:
@@ -0,0 +1,76 @@
+"""Bounded thread pool whose workers never hold up interpreter exit."""
+
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class DaemonThreadPool:
+    """A minimal ThreadPoolExecutor look-alike built on daemon threads.
+
+    concurrent.futures joins its workers at interpreter exit, even after
+    shutdown(wait=False), so one in-flight request would keep a stopped server
+    alive. Workers here are daemons and are started lazily up to max_workers.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "pool"):
+        self._max_workers = max(1, max_workers)
+        self._thread_name_prefix = thread_name_prefix
+        self._work_queue = queue.SimpleQueue()
+        self._idle_semaphore = threading.Semaphore(0)
+        self._threads = []
+        self._shutdown = False
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._work_queue.put((future, fn, args, kwargs))
+            # Reuse an idle worker when there is one, like ThreadPoolExecutor
+            if not self._idle_semaphore.acquire(blocking=False) and len(self._threads) < self._max_workers:
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"{self._thread_name_prefix}_{len(self._threads)}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+        return future
+
+    def _worker(self):
+        while True:
+            item = self._work_queue.get()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            del item
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as exc:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+            del future, fn, args, kwargs
+            self._idle_semaphore.release()
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        item = self._work_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        item[0].cancel()
+            # One stop marker per worker; each exits after its current task
+            for _ in self._threads:
+                self._work_queue.put(None)
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()